@@ -1,27 +1,43 @@
 # ecm_v2.5_directional.py
 
+import sys
 import logging
-import json
 import warnings
 import traceback
 from pathlib import Path
 import time
 import yaml
+import orjson
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.vector_ar.vecm import VECM, select_order, select_coint_rank
+from statsmodels.tsa.vector_ar.vecm import VECM
 import statsmodels.api as sm
-from statsmodels.tsa.stattools import grangercausalitytests, adfuller
+from statsmodels.tsa.adfvalues import mackinnonp, mackinnoncrit
+from statsmodels.tsa.stattools import adfuller
 from arch.unitroot import engle_granger
 from scipy.stats import shapiro
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-import numpy.linalg as LA
 import multiprocessing
-from functools import partial
+from functools import partial, lru_cache
 import psutil
+from threadpoolctl import threadpool_limits
 import geopandas as gpd  # Kept for data loading
 from statsmodels.tsa.seasonal import seasonal_decompose
 
+# The econometric kernels shared with the unified script live in project/utils
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.ecm_stats import (
+    acf_fft, adf_autolag_kernel, arch_lm_test, breusch_godfrey_test, fast_r_matrices,
+    granger_at_lags, jarque_bera_durbin_watson, johansen_trace_rank, pacf_durbin_levinson,
+    select_ecm_order,
+)
+
+# --------------------------- Suppress Non-critical Warnings ---------------------------
+
+# Set at import so spawned pool workers get them too and no per-call catch_warnings is needed
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="statsmodels")
+
 # --------------------------- Configuration and Setup ---------------------------
 
 # Load configuration
@@ -77,6 +93,7 @@ STN_SIG = params['stationarity_significance_level']
 CIG_SIG = params['cointegration_significance_level']
 PARALLEL_PROCESSES = config['parameters']['parallel_processes']
 MEMORY_PER_PROCESS_GB = config['parameters']['memory_per_process_gb']
+VECM_DENSE_MAX_NOBS = params.get('vecm_dense_max_nobs', 500)
 
 def check_memory():
     available_memory = psutil.virtual_memory().available / (1024**3)  # Convert to GB
@@ -86,23 +103,9 @@ def check_memory():
         return max(1, int(available_memory // MEMORY_PER_PROCESS_GB))
     return PARALLEL_PROCESSES
 
-# --------------------------- Helper Functions ---------------------------
-
-# Function to calculate VIF
-def calculate_vif(exog_df):
-    vif_data = pd.DataFrame()
-    vif_data["feature"] = exog_df.columns
-    vif_data["VIF"] = [variance_inflation_factor(exog_df.values, i) for i in range(exog_df.shape[1])]
-    return vif_data
-
-# Function to log correlation matrix
-def log_correlation_matrix(exog_df, title="Correlation Matrix of Exogenous Variables"):
-    try:
-        corr_matrix = exog_df.corr()
-        logger.debug(f"{title}:\n{corr_matrix}")
-    except Exception as e:
-        logger.error(f"Failed to compute correlation matrix: {e}")
-        logger.debug(traceback.format_exc())
+def limit_worker_threads():
+    """Pool initializer: one BLAS thread per worker, since the workers already use every core."""
+    threadpool_limits(limits=1)
 
 # --------------------------- Data Transformation Functions ---------------------------
 
@@ -256,21 +259,27 @@ def load_data():
         # Apply smoothing
         df = apply_smoothing(df, window=3)
 
-        # Proceed with aggregation
-        df_agg = df.groupby(['commodity', 'exchange_rate_regime', 'date']).agg(
+        # Aggregate and reshape in one pass: each (commodity, date, regime) group is already a single
+        # value, so unstacking the regime level gives the wide frame without a second pivot aggregation
+        df_pivot = df.groupby(['commodity', 'date', 'exchange_rate_regime']).agg(
             usdprice=('usdprice', 'mean')
-        ).reset_index()
-
-        df_pivot = df_agg.pivot_table(index=['commodity', 'date'], columns='exchange_rate_regime',
-                                      values=['usdprice'],
-                                      aggfunc='first')
+        ).unstack('exchange_rate_regime')
 
         df_pivot.columns = [f'{var}_{regime}' for var, regime in df_pivot.columns]
         df_pivot = df_pivot.dropna(subset=['usdprice_north', 'usdprice_south'])
 
         logger.debug(f"Data after pivot and alignment shape: {df_pivot.shape}")
 
-        grouped_data = {commodity: df_pivot.xs(commodity, level='commodity') for commodity in df_pivot.index.get_level_values('commodity').unique()}
+        # The pivot is sorted by commodity, so each commodity is one contiguous block of rows;
+        # slice the blocks by position instead of an index lookup per commodity
+        df_pivot = df_pivot.sort_index(level='commodity', sort_remaining=False)
+        codes, commodities = pd.factorize(df_pivot.index.get_level_values('commodity'))
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        grouped_data = {
+            commodities[codes[start]]: df_pivot.iloc[start:end].droplevel('commodity')
+            for start, end in zip(starts, ends)
+        }
 
         logger.debug(f"Data grouped into {len(grouped_data)} groups.")
         return grouped_data
@@ -284,32 +293,61 @@ def load_data():
 
 # Stationarity Tests
 def apply_transformations(series):
-    transformations = {'original': series}
-    if series.isnull().all():
+    arr = np.asarray(series, dtype=np.float64)
+    transformations = {'original': arr}
+    if np.isnan(arr).all():
         return transformations
-    if (series > 0).all():
+    diff = np.diff(arr)
+    # A single reduction also rules out NaNs, so the positive branch needs no masking
+    if np.all(arr > 0):
+        log_arr = np.log(arr)
         transformations.update({
-            'log': np.log(series.replace(0, np.nan)).dropna(),
-            'diff': series.diff().dropna(),
-            'log_diff': np.log(series.replace(0, np.nan)).diff().dropna()
+            'log': log_arr,
+            'diff': diff,
+            'log_diff': np.diff(log_arr)
         })
     else:
         transformations.update({
-            'diff': series.diff().dropna()
+            'diff': diff[~np.isnan(diff)]
         })
     return transformations
 
+@lru_cache(maxsize=1024)
+def _adf_cached(series_bytes):
+    """
+    adfuller(x, autolag='AIC') with the lag search and final regression in the numba kernel,
+    memoized on the raw series bytes since each price series is tested in both directions.
+    """
+    x = np.frombuffer(series_bytes)
+    # Schwert (1989) upper bound on the ADF lag, capped for short series like adfuller
+    nobs = len(x)
+    maxlag = min(nobs // 2 - 2, int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0))))
+    if maxlag < 0 or not np.isfinite(x).all() or x.max() == x.min():
+        # Leave the edge cases to statsmodels so its errors and NaN handling are unchanged
+        return adfuller(x, autolag='AIC')
+
+    adf_stat, usedlag, adf_nobs, icbest = adf_autolag_kernel(x, maxlag)
+    adf_crit = mackinnoncrit(N=1, regression='c', nobs=adf_nobs)
+    return (
+        adf_stat,
+        mackinnonp(adf_stat, regression='c', N=1),
+        usedlag,
+        adf_nobs,
+        {'1%': adf_crit[0], '5%': adf_crit[1], '10%': adf_crit[2]},
+        icbest,
+    )
+
 def run_stationarity_tests(series, variable):
-    logger.debug(f"Running stationarity tests for {variable}")
+    logger.debug("Running stationarity tests for %s", variable)
     results = {}
     transformations = apply_transformations(series)
 
     selected_transformation = None
     for name, transformed in transformations.items():
-        logger.debug(f"Testing transformation: {name}")
+        logger.debug("Testing transformation: %s", name)
         try:
             # Perform ADF test
-            test_result = adfuller(transformed, autolag='AIC')
+            test_result = _adf_cached(np.ascontiguousarray(transformed, dtype=np.float64).tobytes())
             critical_values = test_result[4]  # This is typically a dictionary
             results[name] = {
                 'ADF Statistic': test_result[0],
@@ -331,22 +369,48 @@ def run_stationarity_tests(series, variable):
 
     return {
         'transformation': selected_transformation,
-        'series': transformations[selected_transformation].tolist(),
+        'series': transformations[selected_transformation],
         'results': results.get(selected_transformation, {})
     }
 
+def align_yx(y, x):
+    """
+    Drop observations where either series is NaN and return both as float64 arrays.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    valid = ~(np.isnan(y) | np.isnan(x))
+    return y[valid], x[valid]
+
 # Cointegration Tests
 def run_cointegration_tests(y, x, stationarity_results):
     logger.debug("Running cointegration tests")
     try:
-        y_transformed = pd.Series(stationarity_results['y']['series'])
-        x_transformed = pd.Series(stationarity_results['x']['series'])
+        y_transformed = stationarity_results['y']['series']
+        x_transformed = stationarity_results['x']['series']
 
-        combined = pd.concat([y_transformed, x_transformed], axis=1).dropna()
-        if combined.empty or len(combined) < 2:
+        # Pair observations by position and drop any pair with a NaN in a single mask
+        n = min(len(y_transformed), len(x_transformed))
+        y_transformed, x_transformed = align_yx(y_transformed[:n], x_transformed[:n])
+        if len(y_transformed) < 2:
             raise ValueError("Insufficient data for cointegration test.")
 
-        eg = engle_granger(combined.iloc[:, 0], combined.iloc[:, 1])
+        # A constant series (e.g. no conflict events) cannot be cointegrated; skip the regression
+        if y_transformed.std() < 1e-12 or x_transformed.std() < 1e-12:
+            logger.debug("Constant series, skipping Engle-Granger test")
+            return {
+                'engle_granger': {
+                    'cointegration_statistic': None,
+                    'p_value': None,
+                    'critical_values': None,
+                    'cointegrated': False,
+                    'rho': None
+                },
+                'y_transformation': stationarity_results.get('y', {}).get('transformation', 'original'),
+                'x_transformation': stationarity_results.get('x', {}).get('transformation', 'original')
+            }
+
+        eg = engle_granger(y_transformed, x_transformed)
         coint_result = {
             'engle_granger': {
                 'cointegration_statistic': eg.stat,
@@ -358,7 +422,7 @@ def run_cointegration_tests(y, x, stationarity_results):
             'y_transformation': stationarity_results.get('y', {}).get('transformation', 'original'),
             'x_transformation': stationarity_results.get('x', {}).get('transformation', 'original')
         }
-        logger.debug(f"Engle-Granger p={eg.pvalue}, cointegrated={eg.pvalue < CIG_SIG}")
+        logger.debug("Engle-Granger p=%s, cointegrated=%s", eg.pvalue, eg.pvalue < CIG_SIG)
         return coint_result
     except Exception as e:
         logger.error(f"Cointegration test failed: {e}")
@@ -367,32 +431,22 @@ def run_cointegration_tests(y, x, stationarity_results):
 
 # Estimate ECM
 def estimate_ecm(y, x, max_lags=COIN_MAX_LAGS, ecm_lags=ECM_LAGS):
-    logger.debug(f"Estimating ECM with max_lags={max_lags}, ecm_lags={ecm_lags}")
+    logger.debug("Estimating ECM with max_lags=%s, ecm_lags=%s", max_lags, ecm_lags)
     try:
-        original_length = len(y)
-        logger.debug(f"Original data length: {original_length}")
-
-        endog = pd.concat([y, x], axis=1).dropna()
-        dropped_points = original_length - len(endog)
-        logger.debug(f"Data length after dropping NaNs: {len(endog)}")
-        if dropped_points > 0:
-            logger.info(f"Dropped {dropped_points} data points due to NaN values in ECM estimation")
+        # y and x are already aligned and NaN-free
+        endog = np.column_stack((y, x))
+        logger.debug("Data length: %s", len(endog))
 
         if len(endog) < 2:
             logger.warning("Insufficient data points after cleaning. Skipping ECM estimation.")
             return None, None
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            lag_order_result = select_order(endog, maxlags=min(max_lags, len(endog) // 2 - 1), deterministic='ci')
-
-        optimal_lags = lag_order_result.aic if hasattr(lag_order_result, 'aic') else ecm_lags
+        optimal_lags = select_ecm_order(endog, maxlags=min(max_lags, len(endog) // 2 - 1))
         optimal_lags = max(1, min(optimal_lags, ecm_lags, len(endog) // 2 - 1))
-        logger.debug(f"Optimal lag order by AIC: {optimal_lags}")
+        logger.debug("Optimal lag order by AIC: %s", optimal_lags)
 
-        coint_rank_result = select_coint_rank(endog, det_order=0, k_ar_diff=optimal_lags)
-        coint_rank = max(1, min(coint_rank_result.rank, len(endog.columns) - 1))
-        logger.debug(f"Selected cointegration rank: {coint_rank}")
+        coint_rank = max(1, min(johansen_trace_rank(endog, optimal_lags), endog.shape[1] - 1))
+        logger.debug("Selected cointegration rank: %s", coint_rank)
 
         if coint_rank == 0:
             logger.warning("No cointegration found based on selected rank.")
@@ -400,7 +454,7 @@ def estimate_ecm(y, x, max_lags=COIN_MAX_LAGS, ecm_lags=ECM_LAGS):
 
         model = VECM(endog, k_ar_diff=optimal_lags, coint_rank=coint_rank, deterministic='ci')
 
-        logger.debug(f"VECM Model Parameters:\nEndogenous Variables: {endog.columns.tolist()}\nLag Order: {optimal_lags}\nCointegration Rank: {coint_rank}")
+        logger.debug("VECM Model Parameters:\nEndogenous Variables: %s\nLag Order: %s\nCointegration Rank: %s", endog.shape[1], optimal_lags, coint_rank)
 
         try:
             results = model.fit()
@@ -430,7 +484,7 @@ def compute_model_criteria(results, model):
         else:
             aic = bic = hqic = np.nan
 
-        logger.debug(f"AIC: {aic}, BIC: {bic}, HQIC: {hqic}")
+        logger.debug("AIC: %s, BIC: %s, HQIC: %s", aic, bic, hqic)
         return aic, bic, hqic
     except Exception as e:
         logger.error(f"Model criteria computation failed: {e}")
@@ -438,18 +492,18 @@ def compute_model_criteria(results, model):
         return np.nan, np.nan, np.nan
 
 # Granger Causality Tests
-def compute_granger_causality(y, x):
+
+def compute_granger_causality(y, x, x_name):
     logger.debug("Computing Granger causality")
     gc_results = {}
     try:
         max_lag = GRANGER_MAX_LAGS
-        data = pd.concat([y, x], axis=1).dropna()
-        test_result = grangercausalitytests(data, max_lag, verbose=False)
+        # Every lag 1..max_lag, as grangercausalitytests(data, max_lag) reports them
+        test_result = granger_at_lags(y, x, range(1, max_lag + 1))
         gc_metrics = {}
         for lag, res in test_result.items():
-            ftest_p = res[0]['ssr_ftest'][1]
-            gc_metrics[lag] = {'ssr_ftest_pvalue': ftest_p}
-        gc_results[x.name] = gc_metrics
+            gc_metrics[lag] = {'ssr_ftest_pvalue': res['ssr_ftest'][1]}
+        gc_results[x_name] = gc_metrics
         return gc_results
     except Exception as e:
         logger.error(f"Granger causality tests failed: {e}")
@@ -457,65 +511,69 @@ def compute_granger_causality(y, x):
         return gc_results
 
 # Diagnostics
+# Lags of the residual ACF/PACF in the diagnostics
+DIAG_ACF_LAGS = 20
+
 def run_diagnostics(results):
     if results is None:
         return {}
     try:
-        logger.debug(f"Original resid shape: {results.resid.shape}")
+        logger.debug("Original resid shape: %s", results.resid.shape)
+        # The residuals stay float64: the BG and ARCH auxiliary regressions amplify float32 rounding
+        # (a BG statistic moved by 0.3% on our data), and every kernel works in float64 anyway
         resid = results.resid
+        exog = getattr(results.model, 'exog', None)
+        if exog is not None:
+            # VECM keeps exog for every observation while the residuals skip the first k_ar rows
+            exog = np.asarray(exog)[-len(resid):]
         
+        # ACF/PACF for every residual column at once; the per-column tests take them as inputs
+        # The Yule-Walker PACF needs fewer lags than half the sample
+        if DIAG_ACF_LAGS >= len(resid) // 2:
+            raise ValueError(
+                f"{len(resid)} residuals are too few for a {DIAG_ACF_LAGS}-lag PACF "
+                f"(needs at least {2 * (DIAG_ACF_LAGS + 1)})"
+            )
+        acf_cols = np.ascontiguousarray(acf_fft(resid.reshape(len(resid), -1), nlags=DIAG_ACF_LAGS).T)
+        pacf_cols = pacf_durbin_levinson(acf_cols)
+        jb_stats, jb_pvalues, dw_stats = jarque_bera_durbin_watson(resid.reshape(len(resid), -1))
+        arch_stats, arch_pvalues = arch_lm_test(resid.reshape(len(resid), -1))
+        bg_exog = exog if exog is not None else np.ones((len(resid), 1))
+        bg_stats, bg_pvalues = breusch_godfrey_test(resid.reshape(len(resid), -1), bg_exog)
+
         if resid.ndim == 2 and resid.shape[1] > 1:
             logger.debug("Handling multivariate residuals")
             diagnostics = {}
             for i in range(resid.shape[1]):
                 col_resid = resid[:, i]
-                col_diagnostics = run_univariate_diagnostics(col_resid, getattr(results.model, 'exog', None))
+                col_diagnostics = run_univariate_diagnostics(
+                    col_resid, exog, acf_cols[i], pacf_cols[i], jb_stats[i], jb_pvalues[i], dw_stats[i],
+                    arch_stats[i], arch_pvalues[i], bg_stats[i], bg_pvalues[i]
+                )
                 diagnostics[f'Variable_{i+1}'] = col_diagnostics
             return diagnostics
         else:
-            return run_univariate_diagnostics(resid, getattr(results.model, 'exog', None))
+            return run_univariate_diagnostics(
+                resid, exog, acf_cols[0], pacf_cols[0], jb_stats[0], jb_pvalues[0], dw_stats[0],
+                arch_stats[0], arch_pvalues[0], bg_stats[0], bg_pvalues[0]
+            )
     except Exception as e:
         logger.error(f"Diagnostic tests failed: {e}")
         logger.debug(traceback.format_exc())
         return {}
 
-def run_univariate_diagnostics(resid, exog):
+def run_univariate_diagnostics(resid, exog, acf_vals, pacf_vals, jb_stat, jb_p, dw_stat, arch_stat, arch_p, bg_stat, bg_p):
     resid = resid.squeeze()
     
-    class MockResults:
-        def __init__(self, resid, model):
-            self.resid = resid
-            self.model = model
-
     if exog is None:
         exog = np.ones((len(resid), 1))
-    
-    mock_results = MockResults(resid, sm.OLS(resid, exog))
-    
-    bg_result = sm.stats.diagnostic.acorr_breusch_godfrey(mock_results, nlags=5)
-    bg_stat = bg_result[0] if isinstance(bg_result, tuple) else bg_result.statistic
-    bg_p = bg_result[1] if isinstance(bg_result, tuple) else bg_result.pvalue
 
-    arch_result = sm.stats.diagnostic.het_arch(resid)
-    arch_stat = arch_result[0] if isinstance(arch_result, tuple) else arch_result.statistic
-    arch_p = arch_result[1] if isinstance(arch_result, tuple) else arch_result.pvalue
-
-    jb_result = sm.stats.stattools.jarque_bera(resid)
-    jb_stat = jb_result[0] if isinstance(jb_result, tuple) else jb_result.statistic
-    jb_p = jb_result[1] if isinstance(jb_result, tuple) else jb_result.pvalue
-
-    dw_stat = sm.stats.stattools.durbin_watson(resid)
-    
     if exog.shape[1] > 1:
-        white_result = sm.stats.diagnostic.het_white(resid, exog)
-        white_stat = white_result[0] if isinstance(white_result, tuple) else white_result.statistic
-        white_p = white_result[1] if isinstance(white_result, tuple) else white_result.pvalue
+        white_stat, white_p, _, _ = sm.stats.diagnostic.het_white(resid, exog)
     else:
         white_stat, white_p = np.nan, np.nan
     
     shapiro_stat, shapiro_p = shapiro(resid)
-    acf_vals = sm.tsa.acf(resid, nlags=20).tolist()
-    pacf_vals = sm.tsa.pacf(resid, nlags=20).tolist()
 
     return {
         'breusch_godfrey_stat': float(bg_stat) if not np.isnan(bg_stat) else None,
@@ -529,19 +587,20 @@ def run_univariate_diagnostics(resid, exog):
         'white_test_pvalue': float(white_p) if not np.isnan(white_p) else None,
         'shapiro_wilk_stat': float(shapiro_stat) if not np.isnan(shapiro_stat) else None,
         'shapiro_wilk_pvalue': float(shapiro_p) if not np.isnan(shapiro_p) else None,
-        'acf': acf_vals,
-        'pacf': pacf_vals
+        'acf': acf_vals.tolist(),
+        'pacf': pacf_vals.tolist()
     }
 
 # Impulse Response Functions
 def compute_irfs(results):
     try:
-        irf = results.irf(10)
+        # Only the point IRFs are reported (no error bands are bootstrapped), so take the MA
+        # representation directly instead of building the full IRAnalysis object
         irf_data = {
             'impulse_response': {
-                'irf': irf.irfs.tolist(),
-                'lower': irf.ci[:, :, 0].tolist() if hasattr(irf, 'ci') else None,
-                'upper': irf.ci[:, :, 1].tolist() if hasattr(irf, 'ci') else None
+                'irf': results.ma_rep(10).tolist(),
+                'lower': None,
+                'upper': None
             }
         }
         logger.debug("IRF computation successful")
@@ -551,27 +610,12 @@ def compute_irfs(results):
         logger.debug(traceback.format_exc())
         return None
 
-# JSON Encoder for Numpy and Pandas types
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.ndarray, pd.Series, pd.DataFrame)):
-            return obj.tolist()
-        if isinstance(obj, (np.number, bool)):
-            return obj.item()
-        if isinstance(obj, float) and np.isnan(obj):
-            return None  # JSON does not support NaN
-        return super().default(obj)
-
-# Convert keys to strings recursively and handle NaN
-def convert_keys_to_str(data):
-    if isinstance(data, dict):
-        return {str(k): convert_keys_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_keys_to_str(i) for i in data]
-    elif isinstance(data, float) and np.isnan(data):
-        return None
-    else:
-        return data
+def _json_default(obj):
+    if isinstance(obj, (np.ndarray, pd.Series, pd.DataFrame)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
 
 # Validate analysis result
 def validate_analysis_result(analysis_result):
@@ -585,10 +629,6 @@ def validate_analysis_result(analysis_result):
 # Save Results Function
 def save_results(ecm_results, residuals_storage, direction):
     try:
-        # Convert results to serializable format
-        flattened = convert_keys_to_str(ecm_results)
-        residuals_converted = {commodity: v.tolist() for commodity, v in residuals_storage.items()}
-        
         # Define file paths
         results_dir = dirs['results_dir'] / "ecm"
         results_dir.mkdir(parents=True, exist_ok=True)
@@ -597,13 +637,11 @@ def save_results(ecm_results, residuals_storage, direction):
         residuals_file = results_dir / f"ecm_residuals_{direction.replace('-', '_')}.json"
         
         # Save ECM results
-        with open(ecm_file, 'w') as f:
-            json.dump(flattened, f, indent=4, cls=NumpyEncoder)
+        ecm_file.write_bytes(orjson.dumps(ecm_results, default=_json_default, option=JSON_OPTIONS))
         logger.info(f"ECM results saved to {ecm_file}")
         
         # Save residuals
-        with open(residuals_file, 'w') as f:
-            json.dump(residuals_converted, f, indent=4, cls=NumpyEncoder)
+        residuals_file.write_bytes(orjson.dumps(residuals_storage, default=_json_default, option=JSON_OPTIONS))
         logger.info(f"Residuals saved to {residuals_file}")
         
     except KeyError as e:
@@ -616,53 +654,61 @@ def save_results(ecm_results, residuals_storage, direction):
         raise
 
 # Modify the run_ecm_analysis function to handle a single commodity
-def run_ecm_analysis_single(commodity, df, stationarity_results, cointegration_results, direction='north-to-south'):
+# VECM.fit and the lazily computed results properties partial through r_matrices_fast in here only
+@fast_r_matrices(VECM_DENSE_MAX_NOBS)
+def run_ecm_analysis_single(commodity, prices, direction='north-to-south'):
     try:
         logger.info(f"Starting ECM analysis for {commodity} in {direction} direction")
         
         if direction == 'north-to-south':
-            y = df['usdprice_north']
-            x = df['usdprice_south']
+            y_name, x_name = 'usdprice_north', 'usdprice_south'
         elif direction == 'south-to-north':
-            y = df['usdprice_south']
-            x = df['usdprice_north']
+            y_name, x_name = 'usdprice_south', 'usdprice_north'
         else:
             logger.error(f"Unknown direction: {direction}")
             return None, None
 
-        y, x = y.align(x, join='inner')
+        # Both columns come from the same frame and so share its index; no pandas alignment is needed
+        y = prices[y_name]
+        x = prices[x_name]
 
-        logger.debug(f"Aligned data length for {commodity} in {direction}: {len(y)}")
+        logger.debug("Aligned data length for %s in %s: %s", commodity, direction, len(y))
 
         if len(y) < MIN_OBS:
             logger.warning(f"Not enough aligned observations for {commodity}. Skipping.")
             return None, None
 
+        # Drop NaN pairs once; the ECM and Granger steps share these arrays
+        original_length = len(y)
+        y, x = align_yx(y, x)
+        if len(y) < original_length:
+            logger.info(f"Dropped {original_length - len(y)} data points due to NaN values in ECM estimation")
+
         model, results = estimate_ecm(y, x)
         if model is None or results is None:
             logger.warning(f"ECM estimation failed for {commodity}. Skipping.")
             return None, None
 
-        logger.debug(f"ECM estimation successful for {commodity}. Residuals shape: {results.resid.shape}")
+        logger.debug("ECM estimation successful for %s. Residuals shape: %s", commodity, results.resid.shape)
 
         aic, bic, hqic = compute_model_criteria(results, model)
-        logger.debug(f"Model criteria for {commodity}: AIC={aic}, BIC={bic}, HQIC={hqic}")
+        logger.debug("Model criteria for %s: AIC=%s, BIC=%s, HQIC=%s", commodity, aic, bic, hqic)
 
         diagnostics = run_diagnostics(results)
-        logger.debug(f"Diagnostics computed for {commodity}")
+        logger.debug("Diagnostics computed for %s", commodity)
 
         irf = compute_irfs(results)
-        logger.debug(f"IRF computed for {commodity}")
+        logger.debug("IRF computed for %s", commodity)
 
-        gc = compute_granger_causality(y, x)
-        logger.debug(f"Granger causality computed for {commodity}")
+        gc = compute_granger_causality(y, x, x_name)
+        logger.debug("Granger causality computed for %s", commodity)
 
         # Extract coefficients
         try:
             alpha = results.alpha[0, 0]  # Assuming first cointegration relation
             beta = results.beta[0, 0]    # Assuming first cointegration relation
             gamma = results.gamma[0, 0]  # Assuming first equation
-            logger.debug(f"Extracted coefficients for {commodity}: alpha={alpha}, beta={beta}, gamma={gamma}")
+            logger.debug("Extracted coefficients for %s: alpha=%s, beta=%s, gamma=%s", commodity, alpha, beta, gamma)
         except Exception as e:
             logger.error(f"Failed to extract coefficients for {commodity}: {e}")
             alpha = None  # Use None to represent null in JSON
@@ -694,6 +740,34 @@ def run_ecm_analysis_single(commodity, df, stationarity_results, cointegration_r
         logger.debug(traceback.format_exc())
         return None, None
 
+# Stationarity and cointegration tests for one commodity in both directions
+def run_commodity_tests(commodity, north, south):
+    # Each price series is the dependent variable in one direction and the regressor in the other,
+    # so test it once here rather than once per direction
+    series_tests = {
+        'north': run_stationarity_tests(north, 'usdprice_north'),
+        'south': run_stationarity_tests(south, 'usdprice_south')
+    }
+    outcomes = []
+    for direction, y, x in [('north-to-south', north, south), ('south-to-north', south, north)]:
+        stationarity = {
+            'y': series_tests[direction.split("-")[0]],
+            'x': series_tests[direction.split("-")[2]]
+        }
+        coint = run_cointegration_tests(y, x, stationarity)
+        outcomes.append((f"{commodity}_{direction}", stationarity, coint))
+    return outcomes
+
+def warm_up_kernels():
+    """
+    Compile the numba kernels once in the parent before the pool starts, so workers inherit them
+    (fork) or load them from the on-disk cache (spawn) instead of each compiling its own copy.
+    """
+    # The tests pass read-only views from np.frombuffer, which numba types separately from writable arrays
+    x = np.frombuffer(np.cumsum(np.sin(np.arange(64.0))).tobytes())
+    adf_autolag_kernel(x, 2)
+    pacf_durbin_levinson(np.ascontiguousarray(acf_fft(x.reshape(-1, 1), nlags=5).T))
+
 # Logging with timestamps
 def timed_log(msg):
     logger.info(f"{msg} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -712,55 +786,51 @@ def main():
 
         stationarity_results, cointegration_results = {}, {}
 
-        for commodity, df in data.items():
-            if len(df) < MIN_OBS:
-                logger.warning(f"Insufficient data for {commodity}. Skipping stationarity and cointegration tests.")
-                continue
-            # Perform stationarity and cointegration tests for both directions
-            for direction in ['north-to-south', 'south-to-north']:
-                key = f"{commodity}_{direction}"
-                if direction == 'north-to-south':
-                    y, x = df['usdprice_north'], df['usdprice_south']
-                else:
-                    y, x = df['usdprice_south'], df['usdprice_north']
-
-                stationarity_results[key] = {
-                    'y': run_stationarity_tests(y, f'usdprice_{direction.split("-")[0]}'),
-                    'x': run_stationarity_tests(x, f'usdprice_{direction.split("-")[2]}')
-                }
-
-                coint = run_cointegration_tests(y, x, stationarity_results[key])
-                if coint:
-                    cointegration_results[key] = coint
-
         # Determine the number of processes to use based on available memory
         num_processes = check_memory()
         logger.info(f"Using {num_processes} processes for parallel computation")
 
-        # Run ECM analysis in parallel for both directions
-        for direction in ['north-to-south', 'south-to-north']:
-            timed_log(f"Starting ECM analysis for {direction}")
+        # Only the two price columns are needed, so workers get arrays rather than the DataFrames
+        prices = {
+            commodity: {
+                'usdprice_north': df['usdprice_north'].to_numpy(dtype=np.float64),
+                'usdprice_south': df['usdprice_south'].to_numpy(dtype=np.float64)
+            }
+            for commodity, df in data.items()
+        }
+
+        # Perform stationarity and cointegration tests for both directions
+        tasks = []
+        for commodity, columns in prices.items():
+            if len(columns['usdprice_north']) < MIN_OBS:
+                logger.warning(f"Insufficient data for {commodity}. Skipping stationarity and cointegration tests.")
+                continue
+            tasks.append((commodity, columns['usdprice_north'], columns['usdprice_south']))
 
-            # Prepare the iterable as a list of tuples (commodity, df)
-            iterable = [(commodity, df) for commodity, df in data.items()]
+        warm_up_kernels()
 
-            # Use partial to fix the stationarity_results, cointegration_results, and direction
-            worker_func = partial(
-                run_ecm_analysis_single,
-                stationarity_results=stationarity_results,
-                cointegration_results=cointegration_results,
-                direction=direction
-            )
+        # One pool serves the tests and both ECM directions, so workers import statsmodels once
+        with multiprocessing.Pool(processes=num_processes, initializer=limit_worker_threads) as pool:
+            for outcomes in pool.starmap(run_commodity_tests, tasks):
+                for key, stationarity, coint in outcomes:
+                    stationarity_results[key] = stationarity
+                    if coint:
+                        cointegration_results[key] = coint
+
+            # Run ECM analysis in parallel for both directions
+            for direction in ['north-to-south', 'south-to-north']:
+                timed_log(f"Starting ECM analysis for {direction}")
 
-            with multiprocessing.Pool(processes=num_processes) as pool:
-                results = pool.starmap(worker_func, iterable)
+                # The test results are not read by the ECM step, so only the price arrays are pickled
+                worker_func = partial(run_ecm_analysis_single, direction=direction)
+                results = pool.starmap(worker_func, prices.items())
 
                 # Extract results and residuals
                 ecm_results = [r[0] for r in results if r[0] is not None]
                 residuals = {r[0]['commodity']: r[1] for r in results if r[0] is not None and r[1] is not None}
 
-            save_results(ecm_results, residuals, direction=direction)
-            timed_log(f"Completed ECM analysis for {direction}")
+                save_results(ecm_results, residuals, direction=direction)
+                timed_log(f"Completed ECM analysis for {direction}")
 
         logger.info(f"ECM analysis workflow completed successfully in {time.time() - start_time:.2f} seconds")
     except Exception as e:
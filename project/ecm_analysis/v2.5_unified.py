@@ -1,26 +1,47 @@
 # ecm_analysis_v2.5_unified.py
 
+import os
+import sys
+import pickle
 import logging
-import json
 import warnings
 import traceback
 from pathlib import Path
 import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
 import yaml
+import orjson
 import pandas as pd
+import polars as pl
 import numpy as np
+from numba import njit
 import geopandas as gpd
-from statsmodels.tsa.vector_ar.vecm import VECM, select_order, select_coint_rank
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import grangercausalitytests, adfuller, kpss
-from statsmodels.stats.diagnostic import het_arch, het_white
-from statsmodels.stats.stattools import durbin_watson, jarque_bera
-from arch.unitroot import engle_granger
-from esda.moran import Moran
 from libpysal import weights
+from scipy import sparse
+from threadpoolctl import threadpool_limits
 from scipy.stats import shapiro
+import statsmodels.api as sm
+from statsmodels.tsa.adfvalues import mackinnonp, mackinnoncrit
 from statsmodels.tsa.seasonal import seasonal_decompose
+from statsmodels.tsa.vector_ar.vecm import VECM
+from arch.unitroot import engle_granger
+
+# The econometric kernels shared with the directional script live in project/utils
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.ecm_stats import (
+    acf_fft, adf_autolag_kernel, arch_lm_test, breusch_godfrey_test, fast_r_matrices,
+    granger_at_lags, jarque_bera_durbin_watson, johansen_trace_rank, pacf_durbin_levinson,
+    select_ecm_order,
+)
+
+# --------------------------- Suppress Non-critical Warnings ---------------------------
+
+# Set at import so spawned pool workers get them too and no per-call catch_warnings is needed
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+warnings.filterwarnings("ignore", category=RuntimeWarning, module="statsmodels")
 
 # --------------------------- Configuration and Setup ---------------------------
 
@@ -63,6 +84,7 @@ base_dir = Path(__file__).resolve().parents[2]
 # Define paths based on config
 dirs = {k: base_dir / v for k, v in config['directories'].items()}
 files = {k: base_dir / v for k, v in config['files'].items()}
+CACHE_DIR = dirs.get('cache_dir', dirs['results_dir'] / 'cache')
 
 # Parameters
 params = config['parameters']
@@ -75,6 +97,9 @@ COMMODITIES = params['commodities']
 EXR_REGIMES = params['exchange_rate_regimes']
 STN_SIG = params['stationarity_significance_level']
 CIG_SIG = params['cointegration_significance_level']
+MORAN_PERMUTATIONS = params.get('moran_permutations', 99)
+RANDOM_SEED = params.get('random_seed')
+VECM_DENSE_MAX_NOBS = params.get('vecm_dense_max_nobs', 500)
 
 # --------------------------- Data Transformation Functions ---------------------------
 
@@ -83,22 +108,20 @@ def handle_duplicates(df):
     Handle duplicates by averaging numeric columns.
     """
     try:
-        # Identify numeric and non-numeric columns
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        non_numeric_cols = df.select_dtypes(exclude=['number']).columns.tolist()
-        
-        # Exclude grouping columns from non-numeric columns
         grouping_cols = ['admin1', 'commodity', 'date', 'exchange_rate_regime']
-        non_numeric_cols = [col for col in non_numeric_cols if col not in grouping_cols]
-        
-        # Group by the specified columns and calculate mean for numeric columns
-        df_numeric = df.groupby(grouping_cols)[numeric_cols].mean().reset_index()
-        
-        # For non-numeric columns, take the first value
-        df_non_numeric = df.groupby(grouping_cols)[non_numeric_cols].first().reset_index()
-        
-        # Merge numeric and non-numeric data back together
-        df = pd.merge(df_numeric, df_non_numeric, on=grouping_cols, how='left')
+
+        # Identify numeric and non-numeric columns
+        numeric_cols = [col for col, dtype in df.schema.items() if dtype.is_numeric() and col not in grouping_cols]
+        non_numeric_cols = [col for col, dtype in df.schema.items() if not dtype.is_numeric() and col not in grouping_cols]
+
+        # Average numeric columns and take the first non-null value of the others,
+        # ordered by the grouping columns like a pandas groupby
+        df = (
+            df.drop_nulls(subset=grouping_cols)
+            .group_by(grouping_cols)
+            .agg([pl.col(numeric_cols).mean(), pl.col(non_numeric_cols).drop_nulls().first()])
+            .sort(grouping_cols)
+        )
         
         logger.info("Handled duplicates by averaging numeric columns and keeping first non-numeric values.")
         return df
@@ -189,12 +212,65 @@ def apply_smoothing(df, window=3):
 
 # --------------------------- Data Loading and Preprocessing ---------------------------
 
+def _cached(src_path, cache_name, builder, suffix='.pkl'):
+    """
+    Return builder(src_path), reusing an on-disk copy while the source file's mtime is unchanged.
+    Polars frames are stored as parquet, everything else is pickled.
+    """
+    src_path = Path(src_path)
+    cache_path = CACHE_DIR / f"{src_path.stem}_{cache_name}_{src_path.stat().st_mtime_ns}{suffix}"
+    if cache_path.exists():
+        try:
+            if suffix == '.parquet':
+                return pl.read_parquet(cache_path)
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache {cache_path}: {e}")
+
+    obj = builder(src_path)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in CACHE_DIR.glob(f"{src_path.stem}_{cache_name}_*{suffix}"):
+            stale.unlink()
+        if suffix == '.parquet':
+            obj.write_parquet(cache_path)
+        else:
+            with open(cache_path, 'wb') as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.debug(f"Cached {cache_name} for {src_path.name} at {cache_path}")
+    except Exception as e:
+        logger.warning(f"Could not write cache {cache_path}: {e}")
+    return obj
+
+def build_queen_weights(path):
+    gdf = gpd.read_file(path)
+    w = weights.Queen.from_dataframe(gdf, use_index=False)
+    w.transform = 'r'
+    return w, gdf
+
+ECM_COLUMNS = ['date', 'commodity', 'exchange_rate_regime', 'usdprice', 'conflict_intensity', 'admin1']
+
+def read_ecm_columns(path):
+    """
+    Read the feature properties the ECM needs, with exact duplicate records removed and dates parsed.
+    """
+    # Only the feature properties are needed here, so skip OGR and Shapely geometry construction
+    features = orjson.loads(Path(path).read_bytes())['features']
+    df = pl.from_dicts([feature['properties'] for feature in features], infer_schema_length=None)
+
+    # Deduplicate on every property before pruning, so records that differ only in unused columns are kept
+    df = df.unique(maintain_order=True).select([col for col in ECM_COLUMNS if col in df.columns])
+    if 'date' in df.columns:
+        if df.schema['date'] == pl.String:
+            df = df.with_columns(pl.col('date').str.to_datetime(strict=False))
+        else:
+            df = df.with_columns(pl.col('date').cast(pl.Datetime))
+    return df
+
 def load_spatial_weights(path):
     try:
-        gdf = gpd.read_file(path)
-        w = weights.Queen.from_dataframe(gdf, use_index=False)
-        w.transform = 'r'
-        return w, gdf
+        return _cached(path, 'queen_weights', build_queen_weights)
     except Exception as e:
         logger.error(f"Spatial weights loading failed: {e}")
         logger.debug(traceback.format_exc())
@@ -202,44 +278,97 @@ def load_spatial_weights(path):
 
 spatial_weights, spatial_gdf = load_spatial_weights(files['spatial_geojson'])
 
+def build_sparse_weights(w):
+    """
+    Precompute the COO adjacency and an id -> row position lookup for the spatial weights.
+    """
+    if w is None:
+        return None, {}
+    return w.sparse.tocoo(), {id_: pos for pos, id_ in enumerate(w.id_order)}
+
+spatial_weights_coo, spatial_id_to_pos = build_sparse_weights(spatial_weights)
+
+def to_group_arrays(df, exog_columns=()):
+    """
+    Convert a group DataFrame into contiguous arrays keyed by role: float64 series and float32 regime dummies.
+    """
+    exog = df[list(exog_columns)]
+    return {
+        'y': np.ascontiguousarray(df['usdprice'].to_numpy(dtype=np.float64)),
+        'x': np.ascontiguousarray(df['conflict_intensity'].to_numpy(dtype=np.float64)),
+        # Regime dummies are 0/1, so float32 holds them exactly at half the bytes shipped to workers;
+        # they are upcast when stacked with the float64 prices
+        'exog': np.ascontiguousarray(exog.to_numpy(dtype=np.float32)),
+        'index': df.index.to_numpy(),
+    }
+
+def group_arrays_by_codes(df, columns, exog_columns=()):
+    """
+    Sort df once by the combined integer codes of categorical columns and return {(value, ...): arrays},
+    where each group's arrays are contiguous slices of one sorted block instead of per-group DataFrame copies.
+    """
+    cats = [df[col].cat for col in columns]
+    sizes = [len(cat.categories) for cat in cats]
+    key = np.zeros(len(df), dtype=np.int64)
+    for cat, size in zip(cats, sizes):
+        key = key * size + cat.codes.to_numpy(dtype=np.int64)
+
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    # Reorder only the arrays the analysis uses rather than every column of the frame
+    arrays = {name: arr[order] for name, arr in to_group_arrays(df, exog_columns).items()}
+
+    present = np.unique(sorted_key)
+    starts = np.searchsorted(sorted_key, present, side='left')
+    ends = np.searchsorted(sorted_key, present, side='right')
+
+    groups = {}
+    for code, start, end in zip(present, starts, ends):
+        positions = np.unravel_index(code, sizes)
+        labels = tuple(cat.categories[pos] for cat, pos in zip(cats, positions))
+        groups[labels] = {name: arr[start:end] for name, arr in arrays.items()}
+    return groups
+
 def load_data():
     logger.debug(f"Loading data from {files['spatial_geojson']}")
     try:
-        gdf = gpd.read_file(files['spatial_geojson'])
-        df = gdf.drop(columns='geometry')  # Remove spatial component
+        # The cache holds only the ECM columns, already deduplicated and with parsed dates
+        df = _cached(files['spatial_geojson'], 'ecm_columns', read_ecm_columns, suffix='.parquet')
 
-        required_columns = {'date', 'commodity', 'exchange_rate_regime', 'usdprice', 'conflict_intensity', 'admin1'}
-        missing = required_columns - set(df.columns)
+        missing = set(ECM_COLUMNS) - set(df.columns)
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
 
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        initial_length = len(df)
-        df.drop_duplicates(inplace=True)
-        df.dropna(subset=['date', 'usdprice'], inplace=True)
-        logger.info(f"Dropped {initial_length - len(df)} duplicate or NaN rows based on 'date' and 'usdprice'.")
+        initial_length = df.height
+        df = df.drop_nulls(subset=['date', 'usdprice'])
+        logger.info(f"Dropped {initial_length - df.height} NaN rows based on 'date' and 'usdprice'.")
+
+        # The row filters below are fused into one lazy query, so no intermediate frame is materialized
+        query = df.lazy()
 
         # Exclude 'Amanat Al Asimah' if needed
-        df = df[df['admin1'] != 'Amanat Al Asimah']
-        logger.info("Excluded records from 'Amanat Al Asimah'.")
+        query = query.filter(pl.col('admin1').ne_missing('Amanat Al Asimah'))
+        logger.info("Excluding records from 'Amanat Al Asimah'.")
 
         # Filter for specified commodities
         if COMMODITIES:
-            df = df[df['commodity'].isin(COMMODITIES)]
-            logger.info(f"Filtered data for specified commodities. Number of records: {len(df)}")
+            query = query.filter(pl.col('commodity').is_in(COMMODITIES))
         else:
             logger.warning("No commodities specified in config. Using all available commodities.")
 
         # Filter for exchange rate regimes
         if 'unified' in EXR_REGIMES:
-            df['exchange_rate_regime'] = 'unified'
+            query = query.with_columns(pl.lit('unified').alias('exchange_rate_regime'))
 
-        df = df[df['exchange_rate_regime'].isin(EXR_REGIMES)]
-        logger.debug(f"Data filtered for exchange rate regimes: {EXR_REGIMES}")
+        df = query.filter(pl.col('exchange_rate_regime').is_in(EXR_REGIMES)).collect()
+        logger.info(f"Filtered data for commodities {COMMODITIES} and exchange rate regimes {EXR_REGIMES}. Number of records: {df.height}")
 
         # Handle duplicates by averaging
         df = handle_duplicates(df)
 
+        # Seasonal adjustment and smoothing go through statsmodels and pandas
+        df = df.to_pandas()
+
         # Apply seasonal adjustment
         df = apply_seasonal_adjustment(df, frequency='M')
 
@@ -250,17 +379,17 @@ def load_data():
         df['commodity'] = df['commodity'].astype('category')
         df['exchange_rate_regime'] = df['exchange_rate_regime'].astype('category')
 
-        exchange_dummies = pd.get_dummies(df['exchange_rate_regime'], prefix='er_regime', drop_first=True)
-        if not exchange_dummies.empty:
+        # A single regime (e.g. everything unified) has no dummies, so skip get_dummies entirely
+        exog_columns = []
+        if len(df['exchange_rate_regime'].cat.categories) > 1:
+            exchange_dummies = pd.get_dummies(df['exchange_rate_regime'], prefix='er_regime', drop_first=True)
             df = pd.concat([df, exchange_dummies], axis=1)
-            logger.debug(f"Created dummy variables: {exchange_dummies.columns.tolist()}")
+            exog_columns = exchange_dummies.columns.tolist()
+            logger.debug(f"Created dummy variables: {exog_columns}")
         else:
             logger.debug("No dummy variables created for exchange_rate_regime.")
 
-        grouped_data = {
-            (grp, rgm): grp_df
-            for (grp, rgm), grp_df in df.groupby(['commodity', 'exchange_rate_regime'])
-        }
+        grouped_data = group_arrays_by_codes(df, ['commodity', 'exchange_rate_regime'], exog_columns)
         logger.debug(f"Data grouped into {len(grouped_data)} groups.")
         return grouped_data
     except Exception as e:
@@ -272,37 +401,132 @@ def load_data():
 
 # Stationarity Tests
 def apply_transformations(series):
-    transformations = {'original': series}
-    if series.isnull().all():
+    arr = np.asarray(series, dtype=np.float64)
+    transformations = {'original': arr}
+    if np.isnan(arr).all():
         return transformations
-    if (series > 0).all():
+    diff = np.diff(arr)
+    # A single reduction also rules out NaNs, so the positive branch needs no masking
+    if np.all(arr > 0):
+        log_arr = np.log(arr)
         transformations.update({
-            'log': np.log(series.replace(0, np.nan)).dropna(),
-            'diff': series.diff().dropna(),
-            'log_diff': np.log(series.replace(0, np.nan)).diff().dropna()
+            'log': log_arr,
+            'diff': diff,
+            'log_diff': np.diff(log_arr)
         })
     else:
         transformations.update({
-            'diff': series.diff().dropna()
+            'diff': diff[~np.isnan(diff)]
         })
     return transformations
 
+# KPSS level-stationarity critical values and the p-values they correspond to (Kwiatkowski et al., 1992)
+KPSS_CRIT = np.array([0.347, 0.463, 0.574, 0.739])
+KPSS_PVALUES = np.array([0.10, 0.05, 0.025, 0.01])
+
+@njit(cache=True)
+def _autocov_sum(resids, lag):
+    total = 0.0
+    for t in range(lag, resids.shape[0]):
+        total += resids[t] * resids[t - lag]
+    return total
+
+@njit(cache=True)
+def _kpss_kernel(x, covlags, nobs_cbrt):
+    """
+    KPSS level-stationarity statistic with the Hobijn et al. (1998) lag, as in kpss(x, 'c', nlags='auto').
+    covlags and nobs_cbrt come from the caller because the lag truncation is sensitive to pow rounding.
+    Returns (kpss_stat, nlags).
+    """
+    nobs = x.shape[0]
+    resids = x - x.mean()
+    ssq = np.sum(resids ** 2)
+
+    # Automatic bandwidth
+    s0 = ssq / nobs
+    s1 = 0.0
+    for i in range(1, covlags + 1):
+        prod = _autocov_sum(resids, i) / (nobs / 2.0)
+        s0 += prod
+        s1 += i * prod
+    s_hat = s1 / s0
+    gamma_hat = 1.1447 * np.power(s_hat * s_hat, 1.0 / 3.0)
+    nlags = min(int(gamma_hat * nobs_cbrt), nobs - 1)
+
+    # Long-run variance with Bartlett weights
+    s_lr = ssq
+    for i in range(1, nlags + 1):
+        s_lr += 2 * _autocov_sum(resids, i) * (1.0 - (i / (nlags + 1.0)))
+    eta = np.sum(np.cumsum(resids) ** 2) / (nobs ** 2)
+    return eta / (s_lr / nobs), nlags
+
+@lru_cache(maxsize=1024)
+def _unit_root_tests_cached(series_bytes):
+    """
+    Memoize the ADF and KPSS tests on the raw series bytes so series repeated across groups are tested once.
+    Results have the same layout as adfuller(autolag='AIC') and kpss(regression='c', nlags='auto').
+    """
+    transformed = np.frombuffer(series_bytes)
+    if not np.isfinite(transformed).all():
+        raise ValueError("Series contains NaN or inf values")
+
+    # Schwert (1989) upper bound on the ADF lag, capped for short series like adfuller
+    nobs = len(transformed)
+    maxlag = min(nobs // 2 - 2, int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0))))
+    if maxlag < 0:
+        raise ValueError("sample size is too short to use selected regression component")
+
+    adf_stat, usedlag, adf_nobs, icbest = adf_autolag_kernel(transformed, maxlag)
+    adf_crit = mackinnoncrit(N=1, regression='c', nobs=adf_nobs)
+    adf_result = (
+        adf_stat,
+        mackinnonp(adf_stat, regression='c', N=1),
+        usedlag,
+        adf_nobs,
+        {'1%': adf_crit[0], '5%': adf_crit[1], '10%': adf_crit[2]},
+        icbest,
+    )
+
+    kpss_stat, kpss_lags = _kpss_kernel(
+        transformed, int(np.power(nobs, 2.0 / 9.0)), np.power(nobs, 1.0 / 3.0)
+    )
+    kpss_result = (
+        kpss_stat,
+        np.interp(kpss_stat, KPSS_CRIT, KPSS_PVALUES),
+        kpss_lags,
+        dict(zip(['10%', '5%', '2.5%', '1%'], KPSS_CRIT.tolist())),
+    )
+    return adf_result, kpss_result
+
+def _constant_result():
+    """
+    Placeholder unit root results for a constant series.
+    """
+    untested = {'Statistic': np.nan, 'p-value': np.nan, 'Critical Values': {}, 'Stationary': False}
+    return {'ADF': dict(untested), 'KPSS': dict(untested)}
+
 def run_stationarity_tests(series, variable):
-    logger.debug(f"Running stationarity tests for {variable}")
+    logger.debug("Running stationarity tests for %s", variable)
     results = {}
     transformations = apply_transformations(series)
 
     selected_transformation = None
     for name, transformed in transformations.items():
-        logger.debug(f"Testing transformation: {name}")
+        logger.debug("Testing transformation: %s", name)
         try:
-            # Perform ADF test
-            adf_result = adfuller(transformed, autolag='AIC')
+            # ADF and KPSS are undefined on a constant series and unstable on a near-constant one
+            if np.ptp(transformed) < 1e-10 * max(1.0, np.mean(np.abs(transformed))):
+                logger.debug("Transformation %s is constant. Skipping unit root tests.", name)
+                results[name] = _constant_result()
+                continue
+
+            adf_result, kpss_result = _unit_root_tests_cached(np.ascontiguousarray(transformed, dtype=np.float64).tobytes())
+
+            # ADF test
             adf_stat, adf_p, usedlag, nobs, critical_values, icbest = adf_result
             adf_stationary = adf_p < STN_SIG
 
-            # Perform KPSS test
-            kpss_result = kpss(transformed, regression='c', nlags='auto', store=False)
+            # KPSS test
             kpss_stat, kpss_p, lags, critical_values_kpss = kpss_result
             kpss_stationary = kpss_p > STN_SIG
 
@@ -321,11 +545,11 @@ def run_stationarity_tests(series, variable):
                 }
             }
 
-            logger.debug(f"ADF p={adf_p}, KPSS p={kpss_p} for {name}")
+            logger.debug("ADF p=%s, KPSS p=%s for %s", adf_p, kpss_p, name)
 
             if adf_stationary and kpss_stationary:
                 selected_transformation = name
-                logger.debug(f"Selected transformation: {name}")
+                logger.debug("Selected transformation: %s", name)
                 break
         except Exception as e:
             logger.error(f"Stationarity test failed for {name}: {e}")
@@ -337,7 +561,8 @@ def run_stationarity_tests(series, variable):
 
     return {
         'transformation': selected_transformation,
-        'series': transformations[selected_transformation].tolist(),
+        # Keep the float64 array itself; the cointegration step consumes it as is
+        'series': transformations[selected_transformation],
         'results': results.get(selected_transformation, {})
     }
 
@@ -345,14 +570,33 @@ def run_stationarity_tests(series, variable):
 def run_cointegration_tests(y, x, stationarity_results):
     logger.debug("Running cointegration tests")
     try:
-        y_transformed = pd.Series(stationarity_results['usdprice']['series'])
-        x_transformed = pd.Series(stationarity_results['conflict_intensity']['series'])
-
-        combined = pd.concat([y_transformed, x_transformed], axis=1).dropna()
-        if combined.empty or len(combined) < 2:
+        y_transformed = stationarity_results['usdprice']['series']
+        x_transformed = stationarity_results['conflict_intensity']['series']
+
+        # Pair observations by position and drop any pair with a NaN in a single mask
+        n = min(len(y_transformed), len(x_transformed))
+        y_transformed, x_transformed = y_transformed[:n], x_transformed[:n]
+        valid = ~(np.isnan(y_transformed) | np.isnan(x_transformed))
+        if valid.sum() < 2:
             raise ValueError("Insufficient data for cointegration test.")
+        y_transformed, x_transformed = y_transformed[valid], x_transformed[valid]
+
+        # A constant series (e.g. no conflict events) cannot be cointegrated; skip the regression
+        if y_transformed.std() < 1e-12 or x_transformed.std() < 1e-12:
+            logger.debug("Constant series, skipping Engle-Granger test")
+            return {
+                'engle_granger': {
+                    'cointegration_statistic': None,
+                    'p_value': None,
+                    'critical_values': None,
+                    'cointegrated': False,
+                    'rho': None
+                },
+                'price_transformation': stationarity_results.get('usdprice', {}).get('transformation', 'original'),
+                'conflict_transformation': stationarity_results.get('conflict_intensity', {}).get('transformation', 'original')
+            }
 
-        eg = engle_granger(combined.iloc[:, 0], combined.iloc[:, 1])
+        eg = engle_granger(y_transformed, x_transformed)
         coint_result = {
             'engle_granger': {
                 'cointegration_statistic': eg.stat,
@@ -364,7 +608,7 @@ def run_cointegration_tests(y, x, stationarity_results):
             'price_transformation': stationarity_results.get('usdprice', {}).get('transformation', 'original'),
             'conflict_transformation': stationarity_results.get('conflict_intensity', {}).get('transformation', 'original')
         }
-        logger.debug(f"Engle-Granger p={eg.pvalue}, cointegrated={eg.pvalue < CIG_SIG}")
+        logger.debug("Engle-Granger p=%s, cointegrated=%s", eg.pvalue, eg.pvalue < CIG_SIG)
         return coint_result
     except Exception as e:
         logger.error(f"Cointegration test failed: {e}")
@@ -372,50 +616,59 @@ def run_cointegration_tests(y, x, stationarity_results):
         return None
 
 # Estimate ECM
-def estimate_ecm(price, conflict_intensity, other_exog=None, max_lags=COIN_MAX_LAGS, ecm_lags=ECM_LAGS):
-    logger.debug(f"Estimating ECM with max_lags={max_lags}, ecm_lags={ecm_lags}")
+@lru_cache(maxsize=256)
+def _ecm_order_cached(endog_bytes, exog_bytes, neqs, k_exog, maxlags):
+    """
+    Memoize the VECM lag selection on the raw data bytes so repeated series across groups are searched once.
+    """
+    endog = np.frombuffer(endog_bytes).reshape(-1, neqs)
+    exog = np.frombuffer(exog_bytes).reshape(len(endog), k_exog) if k_exog else None
+    return select_ecm_order(endog, exog=exog, maxlags=maxlags)
+
+@lru_cache(maxsize=256)
+def _coint_rank_cached(endog_bytes, neqs, k_ar_diff):
+    """
+    Memoize the Johansen trace-test rank on the raw data bytes, like the lag selection above.
+    """
+    endog = np.frombuffer(endog_bytes).reshape(-1, neqs)
+    return johansen_trace_rank(endog, k_ar_diff)
+
+def estimate_ecm(endog, exog=None, max_lags=COIN_MAX_LAGS, ecm_lags=ECM_LAGS):
+    logger.debug("Estimating ECM with max_lags=%s, ecm_lags=%s", max_lags, ecm_lags)
     try:
-        # Combine price and conflict intensity as endogenous variables
-        endog = pd.concat([price, conflict_intensity], axis=1).dropna()
-        
-        # Check if we have enough data points after cleaning
+        # endog and exog are already aligned and NaN-free
         if len(endog) < 2:
             logger.warning("Insufficient data points after cleaning. Skipping ECM estimation.")
             return None, None
         
         # Handle exogenous variables
-        if other_exog is not None and not other_exog.empty:
-            exog = other_exog.dropna()
-            # Align exog with endog
-            endog, exog = endog.align(exog, join='inner', axis=0)
-            logger.debug(f"Including exogenous variables: {exog.columns.tolist()}")
+        if exog is not None and exog.shape[1] > 0:
+            logger.debug("Including %s exogenous variables", exog.shape[1])
         else:
             exog = None
-            logger.debug("No exogenous variables provided or all were NaN.")
-        
-        # Check again if we have enough data points after alignment
-        if len(endog) < 2:
-            logger.warning("Insufficient data points after aligning with exogenous variables. Skipping ECM estimation.")
-            return None, None
-
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            lag_order_result = select_order(endog, exog=exog, maxlags=min(max_lags, len(endog) // 2 - 1), deterministic='ci')
-
-        optimal_lags = lag_order_result.aic if hasattr(lag_order_result, 'aic') else ecm_lags
+            logger.debug("No exogenous variables provided.")
+
+        optimal_lags = _ecm_order_cached(
+            np.ascontiguousarray(endog, dtype=np.float64).tobytes(),
+            np.ascontiguousarray(exog, dtype=np.float64).tobytes() if exog is not None else b'',
+            endog.shape[1],
+            exog.shape[1] if exog is not None else 0,
+            min(max_lags, len(endog) // 2 - 1),
+        )
         optimal_lags = max(1, min(optimal_lags, ecm_lags, len(endog) // 2 - 1))
-        logger.debug(f"Optimal lag order by AIC: {optimal_lags}")
+        logger.debug("Optimal lag order by AIC: %s", optimal_lags)
 
-        coint_rank_result = select_coint_rank(endog, det_order=0, k_ar_diff=optimal_lags)
-        coint_rank = coint_rank_result.rank
-        logger.debug(f"Selected cointegration rank: {coint_rank}")
+        coint_rank = _coint_rank_cached(
+            np.ascontiguousarray(endog, dtype=np.float64).tobytes(), endog.shape[1], optimal_lags
+        )
+        logger.debug("Selected cointegration rank: %s", coint_rank)
 
         if coint_rank == 0:
             logger.warning("No cointegration found based on selected rank.")
             return None, None
 
-        # Only pass exog to VECM if it's not None and not empty
-        if exog is not None and not exog.empty:
+        # Only pass exog to VECM if it's provided
+        if exog is not None:
             model = VECM(endog, exog=exog, k_ar_diff=optimal_lags, coint_rank=coint_rank, deterministic='ci')
         else:
             model = VECM(endog, k_ar_diff=optimal_lags, coint_rank=coint_rank, deterministic='ci')
@@ -445,7 +698,7 @@ def compute_model_criteria(results, model):
         else:
             aic = bic = hqic = np.nan
 
-        logger.debug(f"AIC: {aic}, BIC: {bic}, HQIC: {hqic}")
+        logger.debug("AIC: %s, BIC: %s, HQIC: %s", aic, bic, hqic)
         return aic, bic, hqic
     except Exception as e:
         logger.error(f"Model criteria computation failed: {e}")
@@ -453,15 +706,24 @@ def compute_model_criteria(results, model):
         return np.nan, np.nan, np.nan
 
 # Granger Causality Tests
-def compute_granger_causality(y, x):
+@lru_cache(maxsize=256)
+def _granger_cached(y_bytes, x_bytes, maxlag):
+    """
+    Memoize Granger tests on the raw series bytes so repeated series across groups are fitted once.
+    Every lag 1..maxlag is tested, as grangercausalitytests(data, maxlag) reports them.
+    """
+    return granger_at_lags(np.frombuffer(y_bytes), np.frombuffer(x_bytes), range(1, maxlag + 1))
+
+def compute_granger_causality(y, xs):
     logger.debug("Computing Granger causality")
     gc_results = {}
     try:
-        for col in x.columns:
-            test = grangercausalitytests(pd.concat([y, x[col]], axis=1).dropna(), maxlag=GRANGER_MAX_LAGS, verbose=False)
+        y_bytes = np.ascontiguousarray(y, dtype=np.float64).tobytes()
+        for col, x in xs.items():
+            x_bytes = np.ascontiguousarray(x, dtype=np.float64).tobytes()
+            test = _granger_cached(y_bytes, x_bytes, GRANGER_MAX_LAGS)
             gc_metrics = {}
-            for lag, res in test.items():
-                stats = res[0]
+            for lag, stats in test.items():
                 gc_metrics[lag] = {
                     'ssr_ftest_pvalue': stats['ssr_ftest'][1],
                     'ssr_ftest_stat': stats['ssr_ftest'][0],
@@ -480,125 +742,166 @@ def compute_granger_causality(y, x):
         return gc_results
 
 # Spatial Autocorrelation
-def compute_spatial_autocorrelation(residuals, spatial_weights, gdf, filter_indices):
-    # Create an empty Series to hold the residuals with the same index as the gdf
-    full_residuals = pd.Series(index=gdf.index, dtype=float)
-
-    # Only assign the residuals to the indices where we have valid data
-    # Ensure residuals and filter_indices are aligned by filtering non-NaN residuals
-    valid_residual_indices = np.where(~np.isnan(residuals))[0]  # Get non-NaN indices
-    valid_filter_indices = [filter_indices[i] for i in valid_residual_indices]  # Filter matching indices
-    valid_residuals = residuals[valid_residual_indices]  # Filter matching residuals
-    
-    # Assign the valid residuals to the correct indices in the full_residuals series
-    full_residuals.loc[valid_filter_indices] = valid_residuals
+def moran_with_permutations(w_sparse, y, permutations, seed=None, chunk_size=100):
+    """
+    Moran's I and its permutation pseudo p-value for each column of y, computed like esda.Moran's I and p_sim.
+    Permutations are evaluated in chunks with one sparse-dense product for every column at once.
+    A fixed seed makes the p-values reproducible across runs and independent of worker scheduling.
+    """
+    n, k = y.shape
+    z = y - y.mean(axis=0)
+    scale = n / w_sparse.sum() / np.einsum('ij,ij->j', z, z)
+    moran_i = scale * np.einsum('ij,ij->j', z, w_sparse @ z)
+
+    rng = np.random.default_rng(seed)
+    larger = np.zeros(k, dtype=np.int64)
+    for start in range(0, permutations, chunk_size):
+        size = min(chunk_size, permutations - start)
+        # Column c * size + j holds permutation j of residual column c
+        perms = rng.permuted(np.repeat(z, size, axis=1), axis=0)
+        sim = np.repeat(scale, size) * np.einsum('ij,ij->j', perms, w_sparse @ perms)
+        larger += np.count_nonzero((sim >= np.repeat(moran_i, size)).reshape(k, size), axis=1)
+    larger = np.minimum(larger, permutations - larger)
+    return moran_i, (larger + 1.0) / (permutations + 1.0)
+
+@lru_cache(maxsize=32)
+def _filtered_weights(pos_bytes):
+    """
+    Row-standardized sub-matrix of the spatial weights for the given positions, memoized on their
+    bytes: groups with the same locations and NaN pattern reuse one matrix. Callers must not modify it.
+    """
+    pos = np.frombuffer(pos_bytes, dtype=np.int64)
+    remap = np.full(spatial_weights_coo.shape[0], -1, dtype=np.int64)
+    remap[pos] = np.arange(len(pos))
+    rows = remap[spatial_weights_coo.row]
+    cols = remap[spatial_weights_coo.col]
+    keep = (rows >= 0) & (cols >= 0)
+    sub = sparse.coo_matrix(
+        (spatial_weights_coo.data[keep], (rows[keep], cols[keep])), shape=(len(pos), len(pos))
+    ).tocsr()
     
-    # Now only keep the indices with non-NaN residuals
-    valid_indices = full_residuals.dropna().index
+    # Row-standardize the subset; rows without neighbours stay zero
+    row_sums = np.asarray(sub.sum(axis=1)).ravel()
+    scale = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+    return (sparse.diags(scale) @ sub).tocsr()
+
+def compute_spatial_autocorrelation(residuals, filter_indices):
+    """
+    Moran's I for each column of residuals (n x k); rows with a NaN in any column are dropped.
+    Returns one result dict per column.
+    """
+    # Drop NaN residuals, then keep only the ids that exist in the spatial weights
+    finite = ~np.isnan(residuals).any(axis=1)
+    ids = filter_indices[finite].tolist()
+    in_weights = np.fromiter((i in spatial_id_to_pos for i in ids), dtype=bool, count=len(ids))
+    values = residuals[finite][in_weights]
     
-    # Filter the spatial weights to only include the valid indices
-    filtered_weights = weights.W(
-        {key: [neigh for neigh in spatial_weights.neighbors[key] if neigh in valid_indices]
-         for key in valid_indices if key in spatial_weights.neighbors}
+    # Gather the sub-adjacency for the valid ids from the precomputed COO entries
+    pos = np.fromiter(
+        (spatial_id_to_pos[i] for i, ok in zip(ids, in_weights) if ok), dtype=np.int64, count=len(values)
     )
+    sub = _filtered_weights(pos.tobytes())
     
-    # Calculate Moran's I using the valid residuals and filtered spatial weights
-    moran = Moran(full_residuals[valid_indices], filtered_weights)
+    # Calculate Moran's I for all columns against the already standardized weights
+    moran_i, p_sim = moran_with_permutations(sub, values, MORAN_PERMUTATIONS, seed=RANDOM_SEED)
     
-    return {
-        'Moran_I': moran.I,
-        'Moran_p_value': moran.p_sim
-    }
+    return [
+        {'Moran_I': float(i), 'Moran_p_value': float(p)}
+        for i, p in zip(moran_i, p_sim)
+    ]
 
-def run_spatial_autocorrelation(residuals, spatial_weights, gdf, filter_indices):
+def run_spatial_autocorrelation(residuals, spatial_weights, filter_indices):
     if spatial_weights is None:
         logger.warning("Spatial weights not loaded. Skipping spatial autocorrelation tests.")
         return None
 
     try:
-        if isinstance(filter_indices, pd.Index):
-            filter_indices = filter_indices.tolist()
-        elif isinstance(filter_indices, np.ndarray):
-            filter_indices = filter_indices.tolist()
-
-        if isinstance(residuals, np.ndarray) and residuals.ndim == 2 and residuals.shape[1] > 1:
-            spatial_results = {}
-            for i in range(residuals.shape[1]):
-                col_residuals = residuals[:, i]
-                spatial_results[f'Variable_{i+1}'] = compute_spatial_autocorrelation(col_residuals, spatial_weights, gdf, filter_indices)
-            return spatial_results
+        # residuals is the contiguous float64 array from run_group_ecm and filter_indices its row labels
+        if residuals.ndim == 2 and residuals.shape[1] > 1:
+            nan_rows = np.isnan(residuals)
+            if (nan_rows.any(axis=1) == nan_rows.all(axis=1)).all():
+                # Every column drops the same rows, so they share one weights subset and one batched test
+                column_results = compute_spatial_autocorrelation(residuals, filter_indices)
+            else:
+                column_results = [
+                    compute_spatial_autocorrelation(residuals[:, [i]], filter_indices)[0]
+                    for i in range(residuals.shape[1])
+                ]
+            return {f'Variable_{i+1}': result for i, result in enumerate(column_results)}
         else:
-            return compute_spatial_autocorrelation(residuals, spatial_weights, gdf, filter_indices)
+            return compute_spatial_autocorrelation(residuals.reshape(len(residuals), -1), filter_indices)[0]
     except Exception as e:
         logger.error(f"Spatial autocorrelation test failed: {e}")
         logger.debug(traceback.format_exc())
         return None
 
 # Diagnostics
-def run_diagnostics(results):
+# Lags of the residual ACF/PACF in the diagnostics
+DIAG_ACF_LAGS = 20
+
+def run_diagnostics(results, resid):
     if results is None:
         return {}
     try:
-        logger.debug(f"Original resid shape: {results.resid.shape}")
-        resid = results.resid
+        logger.debug("Original resid shape: %s", resid.shape)
+        # The residuals stay float64: the BG and ARCH auxiliary regressions amplify float32 rounding
+        # (a BG statistic moved by 0.3% on our data), and every kernel works in float64 anyway
+        exog = getattr(results.model, 'exog', None)
+        if exog is not None:
+            # VECM keeps exog for every observation while the residuals skip the first k_ar rows
+            exog = np.asarray(exog)[-len(resid):]
         
+        # ACF/PACF for every residual column at once; the per-column tests take them as inputs
+        # The Yule-Walker PACF needs fewer lags than half the sample
+        if DIAG_ACF_LAGS >= len(resid) // 2:
+            raise ValueError(
+                f"{len(resid)} residuals are too few for a {DIAG_ACF_LAGS}-lag PACF "
+                f"(needs at least {2 * (DIAG_ACF_LAGS + 1)})"
+            )
+        acf_cols = np.ascontiguousarray(acf_fft(resid.reshape(len(resid), -1), nlags=DIAG_ACF_LAGS).T)
+        pacf_cols = pacf_durbin_levinson(acf_cols)
+        jb_stats, jb_pvalues, dw_stats = jarque_bera_durbin_watson(resid.reshape(len(resid), -1))
+        arch_stats, arch_pvalues = arch_lm_test(resid.reshape(len(resid), -1))
+        bg_exog = exog if exog is not None else np.ones((len(resid), 1))
+        bg_stats, bg_pvalues = breusch_godfrey_test(resid.reshape(len(resid), -1), bg_exog)
+
         # Handle multivariate residuals
         if resid.ndim == 2 and resid.shape[1] > 1:
             logger.debug("Handling multivariate residuals")
             diagnostics = {}
             for i in range(resid.shape[1]):
                 col_resid = resid[:, i].reshape(-1, 1)
-                col_diagnostics = run_univariate_diagnostics(col_resid, getattr(results.model, 'exog', None))
+                col_diagnostics = run_univariate_diagnostics(
+                    col_resid, exog, acf_cols[i], pacf_cols[i], jb_stats[i], jb_pvalues[i], dw_stats[i],
+                    arch_stats[i], arch_pvalues[i], bg_stats[i], bg_pvalues[i]
+                )
                 diagnostics[f'Variable_{i+1}'] = col_diagnostics
             return diagnostics
         else:
-            return run_univariate_diagnostics(resid, getattr(results.model, 'exog', None))
+            return run_univariate_diagnostics(
+                resid, exog, acf_cols[0], pacf_cols[0], jb_stats[0], jb_pvalues[0], dw_stats[0],
+                arch_stats[0], arch_pvalues[0], bg_stats[0], bg_pvalues[0]
+            )
     except Exception as e:
         logger.error(f"Diagnostic tests failed: {e}")
         logger.debug(traceback.format_exc())
         return {}
 
-def run_univariate_diagnostics(resid, exog):
+def run_univariate_diagnostics(resid, exog, acf_vals, pacf_vals, jb_stat, jb_p, dw_stat, arch_stat, arch_p, bg_stat, bg_p):
     resid = resid.squeeze()
     
-    class MockResults:
-        def __init__(self, resid, model):
-            self.resid = resid
-            self.model = model
-    
     if exog is None:
         exog = np.ones((len(resid), 1))
-    
-    mock_results = MockResults(resid, sm.OLS(resid, exog))
-    
-    # Breusch-Godfrey test
-    bg_result = sm.stats.diagnostic.acorr_breusch_godfrey(mock_results, nlags=5)
-    bg_stat = bg_result[0] if isinstance(bg_result, tuple) else bg_result.statistic
-    bg_p = bg_result[1] if isinstance(bg_result, tuple) else bg_result.pvalue
-
-    # ARCH test
-    arch_result = sm.stats.diagnostic.het_arch(resid)
-    arch_stat = arch_result[0] if isinstance(arch_result, tuple) else arch_result.statistic
-    arch_p = arch_result[1] if isinstance(arch_result, tuple) else arch_result.pvalue
-
-    # Jarque-Bera test
-    jb_result = sm.stats.stattools.jarque_bera(resid)
-    jb_stat = jb_result[0] if isinstance(jb_result, tuple) else jb_result.statistic
-    jb_p = jb_result[1] if isinstance(jb_result, tuple) else jb_result.pvalue
-
-    dw_stat = sm.stats.stattools.durbin_watson(resid)
-    
+
+    # Breusch-Godfrey, ARCH, Jarque-Bera and Durbin-Watson come precomputed for all residual columns
+
     # White test
     if exog.shape[1] > 1:
-        white_result = sm.stats.diagnostic.het_white(resid, exog)
-        white_stat = white_result[0] if isinstance(white_result, tuple) else white_result.statistic
-        white_p = white_result[1] if isinstance(white_result, tuple) else white_result.pvalue
+        white_stat, white_p, _, _ = sm.stats.diagnostic.het_white(resid, exog)
     else:
         white_stat, white_p = np.nan, np.nan
     
     shapiro_stat, shapiro_p = shapiro(resid)
-    acf_vals = sm.tsa.acf(resid, nlags=20).tolist()
-    pacf_vals = sm.tsa.pacf(resid, nlags=20).tolist()
 
     return {
         'breusch_godfrey_stat': float(bg_stat),
@@ -612,19 +915,20 @@ def run_univariate_diagnostics(resid, exog):
         'white_test_pvalue': float(white_p),
         'shapiro_wilk_stat': float(shapiro_stat),
         'shapiro_wilk_pvalue': float(shapiro_p),
-        'acf': acf_vals,
-        'pacf': pacf_vals
+        'acf': acf_vals.tolist(),
+        'pacf': pacf_vals.tolist()
     }
 
 # Impulse Response Functions
 def compute_irfs(results):
     try:
-        irf = results.irf(10)
+        # Only the point IRFs are reported (no error bands are bootstrapped), so take the MA
+        # representation directly instead of building the full IRAnalysis object
         irf_data = {
             'impulse_response': {
-                'irf': irf.irfs.tolist(),
-                'lower': irf.ci[:, :, 0].tolist() if hasattr(irf, 'ci') else None,
-                'upper': irf.ci[:, :, 1].tolist() if hasattr(irf, 'ci') else None
+                'irf': results.ma_rep(10).tolist(),
+                'lower': None,
+                'upper': None
             }
         }
         logger.debug("IRF computation successful")
@@ -634,27 +938,14 @@ def compute_irfs(results):
         logger.debug(traceback.format_exc())
         return None
 
-# JSON Encoder for Numpy and Pandas types
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.ndarray, pd.Series, pd.DataFrame)):
-            return obj.tolist()
-        if isinstance(obj, (np.number, bool)):
-            return obj.item()
-        if isinstance(obj, float) and np.isnan(obj):
-            return None  # JSON does not support NaN
-        return super().default(obj)
-
-# Convert keys to strings recursively and handle NaN
-def convert_keys_to_str(data):
-    if isinstance(data, dict):
-        return {str(k): convert_keys_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_keys_to_str(i) for i in data]
-    elif isinstance(data, float) and np.isnan(data):
-        return None
-    else:
-        return data
+# orjson handles NumPy values and non-string keys natively; this only covers pandas objects
+# and NumPy arrays orjson cannot serialize directly (e.g. non-contiguous)
+def _json_default(obj):
+    if isinstance(obj, (np.ndarray, pd.Series, pd.DataFrame)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
 
 # Validate analysis result
 def validate_analysis_result(analysis_result):
@@ -666,26 +957,46 @@ def validate_analysis_result(analysis_result):
     return analysis_result
 
 # Save Results
-def save_results(ecm_results, residuals_storage):
+def save_results(outcomes):
+    """
+    Write each group's result and residuals as they arrive, so the full result
+    set is never held in memory. The files stay a JSON array and a JSON object
+    because the dashboard parses each one as a whole. Both are written to
+    temporary files first and only replace the previous results once every
+    group has been written, so a failed run leaves the old files intact.
+    """
     try:
-        # Convert results to serializable format
-        flattened = convert_keys_to_str(ecm_results)
-        residuals_converted = {k: v.tolist() for k, v in residuals_storage.items()}
-        
         # Define file paths
         results_dir = dirs['results_dir'] / "ecm"
         results_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save ECM analysis results
         ecm_file = results_dir / "ecm_analysis_results.json"
-        with open(ecm_file, 'w') as f:
-            json.dump(flattened, f, indent=4, cls=NumpyEncoder)
-        logger.info(f"ECM results saved to {ecm_file}")
-        
         # Save residuals separately using same naming convention as directional script
         residuals_file = results_dir / "ecm_residuals.json"
-        with open(residuals_file, 'w') as f:
-            json.dump(residuals_converted, f, indent=4, cls=NumpyEncoder)
+        ecm_tmp = ecm_file.with_name(ecm_file.name + '.tmp')
+        residuals_tmp = residuals_file.with_name(residuals_file.name + '.tmp')
+        
+        try:
+            count = 0
+            with open(ecm_tmp, 'wb') as ecm_out, open(residuals_tmp, 'wb') as residuals_out:
+                ecm_out.write(b'[')
+                residuals_out.write(b'{')
+                for key, analysis_result, resid in outcomes:
+                    separator = b',\n' if count else b'\n'
+                    ecm_out.write(separator + orjson.dumps(analysis_result, default=_json_default, option=JSON_OPTIONS))
+                    residuals_out.write(
+                        separator + orjson.dumps(key) + b': '
+                        + orjson.dumps(resid, default=_json_default, option=JSON_OPTIONS)
+                    )
+                    count += 1
+                ecm_out.write(b'\n]' if count else b']')
+                residuals_out.write(b'\n}' if count else b'}')
+            os.replace(ecm_tmp, ecm_file)
+            os.replace(residuals_tmp, residuals_file)
+        finally:
+            # Interrupted or failed runs: drop the partial files, keep the previous results
+            for tmp in (ecm_tmp, residuals_tmp):
+                tmp.unlink(missing_ok=True)
+        logger.info(f"ECM results saved to {ecm_file} ({count} groups)")
         logger.info(f"Residuals saved to {residuals_file}")
         
     except Exception as e:
@@ -694,97 +1005,140 @@ def save_results(ecm_results, residuals_storage):
         raise
 
 # ECM Analysis
-def run_ecm_analysis(data, stationarity_results, cointegration_results, gdf):
-    all_results = []
-    residuals_storage = {}
-    for (commodity, regime), df in data.items():
-        try:
-            logger.info(f"Running ECM analysis for {commodity} in {regime} regime")
-            if len(df) < MIN_OBS:
-                logger.warning(f"Not enough observations for {commodity} in {regime} regime. Skipping.")
-                continue
+# ECM estimation, diagnostics and spatial checks for one group; runs in a worker process
+# VECM.fit and the lazily computed results properties partial through r_matrices_fast in here only
+@fast_r_matrices(VECM_DENSE_MAX_NOBS)
+def run_group_ecm(item):
+    (commodity, regime), group = item
+    key = f"{commodity}_{regime}"
+    try:
+        logger.info(f"Running ECM analysis for {commodity} in {regime} regime")
 
-            key = f"{commodity}_{regime}"
-            stationarity = stationarity_results.get(key)
-            if not stationarity:
-                logger.warning(f"No stationarity results for {key}. Skipping.")
-                continue
+        # Drop rows with a NaN in any column once; the ECM and Granger steps share these arrays
+        stacked = np.column_stack([group['y'], group['x'], group['exog']])
+        valid = ~np.isnan(stacked).any(axis=1)
+        endog = np.ascontiguousarray(stacked[valid, :2])
+        exog = np.ascontiguousarray(stacked[valid, 2:])
+        logger.debug("Aligned data length: %s", len(endog))
 
-            coint = cointegration_results.get(key)
-            if not coint or not coint['engle_granger']['cointegrated']:
-                logger.warning(f"No cointegration results for {key}. Skipping.")
-                continue
+        if len(endog) < MIN_OBS:
+            logger.warning(f"Not enough aligned observations for {commodity} in {regime} regime. Skipping.")
+            return None
 
-            y = df['usdprice']
-            x = df[['conflict_intensity']]
-            exog = df.filter(regex='^er_regime_')
-            y, x = y.align(x, join='inner')
-            if not exog.empty:
-                exog = exog.loc[y.index]
-            logger.debug(f"Aligned data length: {len(y)}")
+        model, results = estimate_ecm(endog, exog)
+        if model is None or results is None:
+            logger.warning(f"ECM estimation failed for {commodity} in {regime} regime. Skipping.")
+            return None
 
-            if len(y) < MIN_OBS:
-                logger.warning(f"Not enough aligned observations for {commodity} in {regime} regime. Skipping.")
-                continue
+        # Convert the residuals once; diagnostics, spatial tests and storage share this array
+        resid = np.ascontiguousarray(results.resid, dtype=np.float64)
 
-            model, results = estimate_ecm(df['usdprice'], df['conflict_intensity'], other_exog=exog)
-            if model is None or results is None:
-                logger.warning(f"ECM estimation failed for {commodity} in {regime} regime. Skipping.")
-                continue
+        aic, bic, hqic = compute_model_criteria(results, model)
+        diagnostics = run_diagnostics(results, resid)
+        irf = compute_irfs(results)
+        gc = compute_granger_causality(endog[:, 0], {'conflict_intensity': endog[:, 1]})
 
-            aic, bic, hqic = compute_model_criteria(results, model)
-            diagnostics = run_diagnostics(results)
-            irf = compute_irfs(results)
-            gc = compute_granger_causality(y, x)
-
-            # Extract Alpha, Beta, and Gamma coefficients
-            try:
-                alpha = results.alpha[0, 0]  # Assuming first cointegration relation
-                beta = results.beta[0, 0]    # Assuming first cointegration relation
-                gamma = results.gamma[0, 0]  # Assuming first equation
-                logger.debug(f"Extracted coefficients: alpha={alpha}, beta={beta}, gamma={gamma}")
-            except Exception as e:
-                logger.error(f"Failed to extract coefficients: {e}")
-                alpha = None  # Use None to represent null in JSON
-                beta = None
-                gamma = None
-
-            residuals_storage[key] = results.resid
-
-            filter_indices = df.index.tolist()
-            spatial = run_spatial_autocorrelation(results.resid, spatial_weights, gdf, filter_indices)
-
-            # Include Alpha, Beta, and Gamma in the results
-            analysis_result = {
-                'commodity': commodity,
-                'regime': regime,
-                'aic': aic,
-                'bic': bic,
-                'hqic': hqic,
-                'alpha': alpha,
-                'beta': beta,
-                'gamma': gamma,
-                'diagnostics': diagnostics,
-                'irf': irf,
-                'granger_causality': gc,
-                'spatial_autocorrelation': spatial,
-            }
+        # Extract Alpha, Beta, and Gamma coefficients
+        try:
+            alpha = results.alpha[0, 0]  # Assuming first cointegration relation
+            beta = results.beta[0, 0]    # Assuming first cointegration relation
+            gamma = results.gamma[0, 0]  # Assuming first equation
+            logger.debug("Extracted coefficients: alpha=%s, beta=%s, gamma=%s", alpha, beta, gamma)
+        except Exception as e:
+            logger.error(f"Failed to extract coefficients: {e}")
+            alpha = None  # Use None to represent null in JSON
+            beta = None
+            gamma = None
+
+        # VECM drops the first k_ar observations, so residual rows map to the trailing labels
+        filter_indices = group['index'][valid][-len(resid):]
+        spatial = run_spatial_autocorrelation(resid, spatial_weights, filter_indices)
+
+        # Include Alpha, Beta, and Gamma in the results
+        analysis_result = {
+            'commodity': commodity,
+            'regime': regime,
+            'aic': aic,
+            'bic': bic,
+            'hqic': hqic,
+            'alpha': alpha,
+            'beta': beta,
+            'gamma': gamma,
+            'diagnostics': diagnostics,
+            'irf': irf,
+            'granger_causality': gc,
+            'spatial_autocorrelation': spatial,
+        }
 
-            # Validate analysis result
-            analysis_result = validate_analysis_result(analysis_result)
+        # Validate analysis result
+        analysis_result = validate_analysis_result(analysis_result)
 
-            all_results.append(analysis_result)
-        except Exception as e:
-            logger.error(f"ECM analysis failed for {commodity} in {regime} regime: {e}")
-            logger.debug(traceback.format_exc())
-    return all_results, residuals_storage
+        return key, analysis_result, resid
+    except Exception as e:
+        logger.error(f"ECM analysis failed for {commodity} in {regime} regime: {e}")
+        logger.debug(traceback.format_exc())
+        return None
+
+def run_ecm_analysis(executor, data, stationarity_results, cointegration_results, chunksize=1):
+    """Yield (key, analysis_result, residuals) for each group as the workers finish it."""
+    eligible = {}
+    for (commodity, regime), group in data.items():
+        if len(group['y']) < MIN_OBS:
+            logger.warning(f"Not enough observations for {commodity} in {regime} regime. Skipping.")
+            continue
+
+        key = f"{commodity}_{regime}"
+        stationarity = stationarity_results.get(key)
+        if not stationarity:
+            logger.warning(f"No stationarity results for {key}. Skipping.")
+            continue
+
+        coint = cointegration_results.get(key)
+        if not coint or not coint['engle_granger']['cointegrated']:
+            logger.warning(f"No cointegration results for {key}. Skipping.")
+            continue
+        eligible[(commodity, regime)] = group
+
+    for outcome in executor.map(run_group_ecm, eligible.items(), chunksize=chunksize):
+        if outcome is not None:
+            yield outcome
 
 # Logging with timestamps
 def timed_log(msg):
     logger.info(f"{msg} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
+# Stationarity and cointegration for one group; runs in a worker process
+def run_group_unit_root_and_coint(item):
+    (commodity, regime), group = item
+    start_group_time = time.time()
+    key = f"{commodity}_{regime}"
+    timed_log(f"Running stationarity tests for {key}")
+    stationarity = {
+        'usdprice': run_stationarity_tests(group['y'], 'usdprice'),
+        'conflict_intensity': run_stationarity_tests(group['x'], 'conflict_intensity')
+    }
+    timed_log(f"Stationarity tests for {key} completed in {time.time() - start_group_time:.2f} seconds")
+    
+    coint = run_cointegration_tests(group['y'], group['x'], stationarity)
+    return key, stationarity, coint
+
 # --------------------------- Main Workflow ---------------------------
 
+def warm_up_kernels():
+    """
+    Compile the numba kernels once in the parent before the pool starts, so workers inherit them
+    (fork) or load them from the on-disk cache (spawn) instead of each compiling its own copy.
+    """
+    # The tests pass read-only views from np.frombuffer, which numba types separately from writable arrays
+    x = np.frombuffer(np.cumsum(np.sin(np.arange(64.0))).tobytes())
+    adf_autolag_kernel(x, 2)
+    _kpss_kernel(x, 2, np.power(len(x), 1.0 / 3.0))
+    pacf_durbin_levinson(np.ascontiguousarray(acf_fft(x.reshape(-1, 1), nlags=5).T))
+
+def init_worker():
+    """Pool initializer: one BLAS thread per worker, since the workers already use every core."""
+    threadpool_limits(limits=1)
+
 def main():
     timed_log("Starting ECM analysis workflow")
     try:
@@ -796,25 +1150,28 @@ def main():
         
         stationarity_results, cointegration_results = {}, {}
         
-        for (commodity, regime), df in data.items():
-            start_group_time = time.time()
-            if len(df) < MIN_OBS:
+        eligible = {}
+        for (commodity, regime), group in data.items():
+            if len(group['y']) < MIN_OBS:
                 logger.warning(f"Insufficient data for {commodity} in {regime}. Skipping stationarity and cointegration tests.")
                 continue
-            key = f"{commodity}_{regime}"
-            timed_log(f"Running stationarity tests for {key}")
-            stationarity_results[key] = {
-                'usdprice': run_stationarity_tests(df['usdprice'], 'usdprice'),
-                'conflict_intensity': run_stationarity_tests(df['conflict_intensity'], 'conflict_intensity')
-            }
-            timed_log(f"Stationarity tests for {key} completed in {time.time() - start_group_time:.2f} seconds")
-            
-            coint = run_cointegration_tests(df['usdprice'], df['conflict_intensity'], stationarity_results[key])
-            if coint:
-                cointegration_results[key] = coint
+            eligible[(commodity, regime)] = group
         
-        ecm_results, residuals_storage = run_ecm_analysis(data, stationarity_results, cointegration_results, spatial_gdf)
-        save_results(ecm_results, residuals_storage)
+        # Groups are independent, so test and estimate them in parallel; one pool serves both phases,
+        # and chunking sends several groups per round-trip
+        max_workers = os.cpu_count() - 1 if os.cpu_count() > 1 else 1  # Reserve one core
+        chunksize = max(1, len(eligible) // (4 * max_workers))
+        warm_up_kernels()
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as executor:
+            for key, stationarity, coint in executor.map(run_group_unit_root_and_coint, eligible.items(), chunksize=chunksize):
+                stationarity_results[key] = stationarity
+                if coint:
+                    cointegration_results[key] = coint
+            
+            # The results are written while the pool still produces them, so this stays inside the block
+            save_results(run_ecm_analysis(
+                executor, data, stationarity_results, cointegration_results, chunksize=chunksize
+            ))
         
         logger.info(f"ECM analysis workflow completed successfully in {time.time() - start_time:.2f} seconds")
     except Exception as e:
@@ -141,11 +141,14 @@ def fill_missing_prices(group, date_column, frequency, group_name):
     
         # Interpolate missing values for 'usdprice'
         if 'usdprice' in group.columns:
-            group['usdprice'] = group['usdprice'].interpolate(method='time')
-            logging.debug("Interpolated missing 'usdprice' values using time method.")
-            # Forward/backward fill for leading/trailing NaNs
-            group['usdprice'] = group['usdprice'].bfill().ffill()
-            logging.debug("Applied forward/backward fill for 'usdprice'.")
+            # One np.interp over the timestamps: linear in time between observed prices and held at the
+            # first/last observed value beyond them, i.e. interpolate(method='time').bfill().ffill()
+            prices = group['usdprice'].to_numpy(dtype=np.float64)
+            observed = ~np.isnan(prices)
+            if observed.any() and not observed.all():
+                timestamps = group.index.asi8.astype(np.float64)
+                group['usdprice'] = np.interp(timestamps, timestamps[observed], prices[observed])
+            logging.debug("Interpolated missing 'usdprice' values in time and filled leading/trailing gaps.")
         else:
             logging.warning(f"'usdprice' column not found in group: {group_name}")
     
@@ -176,7 +179,9 @@ def seasonal_adjustment(group, frequency):
         logging.info(f"Performing seasonal adjustment for {commodity} in {regime}, admin1: {admin1}.")
 
         logging.debug(f"Group size: {len(group)}")
-        logging.debug(f"Group data:\n{group.head()}")
+        # Rendering the preview costs more than the check, and this runs once per group
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Group data:\n{group.head()}")
 
         # Determine period based on frequency
         if frequency == 'ME':
@@ -1,6 +1,7 @@
 # project/price_differential_analysis/price_differential_model_v2.py
 
 import json
+import orjson
 import pandas as pd
 import numpy as np
 import geopandas as gpd
@@ -392,18 +393,19 @@ def analyze_market_pair(args):
             logger.warning(f"Missing data for {base_market} or {other_market} on {commodity}. Skipping.")
             return None
 
-        common_dates = np.intersect1d(base_data['date'], other_data['date'])
+        # Dates are unique and sorted per market (prepare_market_data groups by date), so one
+        # intersection also gives the positions of the common dates in both series
+        common_dates, idx_base, idx_other = np.intersect1d(
+            base_data['date'], other_data['date'], assume_unique=True, return_indices=True
+        )
         logger.debug(f"Found {len(common_dates)} common dates for {base_market} and {other_market} on {commodity}")
 
         if len(common_dates) < MIN_COMMON_DATES:
             logger.warning(f"Insufficient common dates ({len(common_dates)}) for {base_market} and {other_market} on {commodity}. Skipping.")
             return None
 
-        mask_base = np.isin(base_data['date'], common_dates)
-        mask_other = np.isin(other_data['date'], common_dates)
-
-        price_i = base_data['usdprice'][mask_base]
-        price_j = other_data['usdprice'][mask_other]
+        price_i = base_data['usdprice'][idx_base]
+        price_j = other_data['usdprice'][idx_other]
 
         logger.debug(f"Price_i length: {len(price_i)}, Price_j length: {len(price_j)}")
 
@@ -445,8 +447,8 @@ def analyze_market_pair(args):
             return None
 
         # Ensure conflict_intensity arrays align with common dates
-        conflict_base = base_data['conflict_intensity'][mask_base][valid_mask]
-        conflict_other = other_data['conflict_intensity'][mask_other][valid_mask]
+        conflict_base = base_data['conflict_intensity'][idx_base][valid_mask]
+        conflict_other = other_data['conflict_intensity'][idx_other][valid_mask]
 
         logger.debug(f"Conflict_base length: {len(conflict_base)}, Conflict_other length: {len(conflict_other)}")
 
@@ -623,8 +625,12 @@ def main(file_path):
     # Save all results in a plain JSON file with indentation and sorted keys
     output_file = price_diff_results_dir / "price_differential_results.json"
     try:
-        with open(output_file, "w") as f:
-            json.dump(final_results, f, default=default, indent=4, sort_keys=True)
+        # orjson serializes NumPy values and datetimes natively and calls default for the rest
+        output_file.write_bytes(orjson.dumps(
+            final_results,
+            default=default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        ))
         logger.info(f"All results saved to {output_file}")
     except Exception as e:
         logger.error(f"Error saving results to {output_file}: {e}")
@@ -4,17 +4,17 @@ import os
 import sys
 import logging
 import json
+import orjson
 import yaml
 import pandas as pd
 import numpy as np
 import geopandas as gpd
 from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import mean_squared_error
-from scipy import stats
+from sklearn.metrics import mean_squared_error, r2_score
+from scipy import linalg, stats
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 from statsmodels.tsa.seasonal import seasonal_decompose
 from libpysal.weights import KNN
@@ -363,27 +363,36 @@ def calculate_spatial_lag(gdf, w, variable, logger):
 def run_ridge_regression(X, y, alpha, logger):
     """
     Perform Ridge regression on the provided features and target.
+    Solves (X'X + alpha*I) b = X'y on the centered data, as sklearn's Ridge does with its
+    cholesky solver, and returns (coefficients, intercept).
     """
     try:
-        model = Ridge(alpha=alpha)
-        model.fit(X, y)
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        X_offset = X.mean(axis=0)
+        y_offset = y.mean()
+        X_centered = X - X_offset
+        gram = X_centered.T @ X_centered
+        gram.flat[::X.shape[1] + 1] += alpha
+        coef = linalg.solve(gram, X_centered.T @ (y - y_offset), assume_a='pos')
+        intercept = y_offset - X_offset @ coef
         logger.debug("Ridge regression model fitted successfully.")
-        return model
+        return coef, intercept
     except Exception as e:
         logger.error(f"Ridge regression failed: {e}")
         raise
 
-def calculate_p_values(model, X, y, logger):
+def calculate_p_values(coef, X, y, fitted, logger):
     """
     Calculate p-values for Ridge regression coefficients.
     Note: Ridge regression does not provide p-values directly. This is an approximation.
     """
     try:
-        mse = mean_squared_error(y, model.predict(X))
+        mse = mean_squared_error(y, fitted)
         X_with_const = np.hstack([np.ones((X.shape[0], 1)), X])
         inv = np.linalg.inv(X_with_const.T @ X_with_const)
         var_b = mse * inv.diagonal()
-        t_stat = model.coef_ / np.sqrt(var_b[1:])  # Exclude intercept
+        t_stat = coef / np.sqrt(var_b[1:])  # Exclude intercept
         p_values = 2 * (1 - stats.t.cdf(np.abs(t_stat), df=len(y) - X.shape[1] - 1))
         logger.debug("P-values calculated for Ridge regression coefficients.")
         return p_values
@@ -403,9 +412,27 @@ def calculate_vif(X, logger):
             })
             logger.debug("Single predictor detected. VIF set to 1.0.")
         else:
+            # VIF_i = 1 / (1 - R_i^2) of column i on the others = TSS_i * (G^-1)_ii with G = X'X: one inverse
+            # instead of one regression per column
+            values = X.to_numpy(dtype=np.float64)
+            gram = values.T @ values
+            try:
+                gram_inv_diag = np.diag(linalg.inv(gram))
+                # statsmodels centres R_i^2 when the other columns span a constant, i.e. when the constant
+                # is a combination of them that leaves column i out
+                ones = np.ones(len(values))
+                combo = linalg.lstsq(values, ones)[0]
+                tol = 1e-8 * np.sqrt(len(values))
+                spans_const = np.linalg.norm(values @ combo - ones) < tol
+                others_const = spans_const & (np.abs(combo) * np.linalg.norm(values, axis=0) < tol)
+                centered_tss = ((values - values.mean(axis=0)) ** 2).sum(axis=0)
+                vif = np.where(others_const, centered_tss, np.diag(gram)) * gram_inv_diag
+            except linalg.LinAlgError:
+                # Exactly collinear columns: fall back to the per-column regressions
+                vif = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
             vif_data = pd.DataFrame({
                 'Variable': X.columns,
-                'VIF': [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
+                'VIF': vif
             })
             logger.debug("Variance Inflation Factor (VIF) calculated successfully.")
         return vif_data
@@ -469,12 +496,14 @@ def run_spatial_analysis(gdf, commodity, regime, params, logger):
         logger.debug("Features standardized using StandardScaler.")
 
         # Run Ridge regression
-        model = run_ridge_regression(X_scaled, y, params['ridge_alpha'], logger)
+        coef, intercept = run_ridge_regression(X_scaled, y, params['ridge_alpha'], logger)
 
-        # Calculate additional metrics
-        p_values = calculate_p_values(model, X_scaled, y, logger)
+        # Calculate additional metrics from one set of fitted values
+        fitted = X_scaled.to_numpy() @ coef + intercept
+        r_squared = r2_score(y, fitted)
+        p_values = calculate_p_values(coef, X_scaled, y, fitted, logger)
         vif = calculate_vif(X, logger)
-        residual = y - model.predict(X_scaled)
+        residual = y - fitted
         moran_i = calculate_moran(residual, w, logger)
 
         # Prepare the residual DataFrame
@@ -485,12 +514,12 @@ def run_spatial_analysis(gdf, commodity, regime, params, logger):
         results = {
             'commodity': commodity,
             'regime': regime,
-            'coefficients': dict(zip(X.columns, model.coef_)),
-            'intercept': model.intercept_,
+            'coefficients': dict(zip(X.columns, coef)),
+            'intercept': intercept,
             'p_values': dict(zip(X.columns, p_values)),
-            'r_squared': model.score(X_scaled, y),
-            'adj_r_squared': 1 - (1 - model.score(X_scaled, y)) * (len(y) - 1) / (len(y) - X_scaled.shape[1] - 1),
-            'mse': mean_squared_error(y, model.predict(X_scaled)),
+            'r_squared': r_squared,
+            'adj_r_squared': 1 - (1 - r_squared) * (len(y) - 1) / (len(y) - X_scaled.shape[1] - 1),
+            'mse': mean_squared_error(y, fitted),
             'vif': vif.to_dict('records'),
             'moran_i': moran_i,
             'observations': len(y),
@@ -503,13 +532,6 @@ def run_spatial_analysis(gdf, commodity, regime, params, logger):
         logger.error(f"Error in spatial analysis for '{commodity}' in '{regime}': {e}")
         return None
 
-def process_commodity_regime(args):
-    """
-    Wrapper function to process a single commodity-regime combination.
-    """
-    gdf, commodity, regime, params, logger = args
-    return run_spatial_analysis(gdf, commodity, regime, params, logger)
-
 def aggregate_residuals(results, time_column, logger):
     """
     Aggregate residuals from all analysis results.
@@ -617,26 +639,21 @@ def save_analysis_results(results, output_path, logger):
     """
     try:
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        # Convert Timestamps to strings
+        # orjson serializes NumPy values natively; Timestamps are written as ISO strings as before
         def convert_timestamps(obj):
             if isinstance(obj, pd.Timestamp):
                 return obj.isoformat()
-            if isinstance(obj, dict):
-                return {k: convert_timestamps(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [convert_timestamps(i) for i in obj]
-            return obj
-
-        results_with_str_timestamps = convert_timestamps(results)
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
         # Save results to JSON
-        with open(output_path, 'w') as f:
-            json.dump(results_with_str_timestamps, f, indent=4)
+        output_path.write_bytes(
+            orjson.dumps(results, default=convert_timestamps, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+        )
         logger.info(f"Results saved to {output_path}.")
 
         # Validate that residuals are present
         residuals_present = any(
-            analysis.get('residual') for analysis in results_with_str_timestamps
+            analysis.get('residual') for analysis in results
         )
         if residuals_present:
             logger.info("Residuals are present in the analysis results.")
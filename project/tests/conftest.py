@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make project/utils importable as `utils`, as the analysis scripts do
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,162 @@
+"""
+Each shared ECM kernel against the statsmodels routine it replaces.
+"""
+
+import numpy as np
+import pytest
+import statsmodels.api as sm
+from statsmodels.stats.diagnostic import acorr_breusch_godfrey, het_arch
+from statsmodels.stats.stattools import durbin_watson, jarque_bera
+from statsmodels.tsa.api import VAR
+from statsmodels.tsa.stattools import acf, adfuller, grangercausalitytests, pacf
+from statsmodels.tsa.vector_ar import vecm as vecm_module
+from statsmodels.tsa.vector_ar.vecm import select_coint_rank, select_order
+
+from utils.ecm_stats import (
+    acf_fft, adf_autolag_kernel, arch_lm_test, breusch_godfrey_test, fast_r_matrices,
+    granger_at_lags, jarque_bera_durbin_watson, johansen_trace_rank, pacf_durbin_levinson,
+    r_matrices_fast, select_ecm_order, var_aic_by_lag,
+)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(12345)
+
+
+def cointegrated_pair(rng, nobs):
+    # A random walk and a noisy copy of it
+    x = np.cumsum(rng.normal(size=nobs))
+    y = 0.8 * x + rng.normal(scale=0.5, size=nobs)
+    return np.column_stack([y, x])
+
+
+@pytest.mark.parametrize('maxlag', [0, 1, 4, 8])
+def test_adf_autolag_kernel_matches_adfuller(rng, maxlag):
+    x = np.cumsum(rng.normal(size=120))
+    adf_stat, usedlag, nobs, icbest = adf_autolag_kernel(x, maxlag)
+    expected = adfuller(x, maxlag=maxlag, regression='c', autolag='AIC')
+    assert usedlag == expected[2]
+    assert nobs == expected[3]
+    np.testing.assert_allclose(adf_stat, expected[0], rtol=1e-10)
+    np.testing.assert_allclose(icbest, expected[5], rtol=1e-10)
+
+
+@pytest.mark.parametrize('with_exog', [False, True])
+def test_var_aic_by_lag_matches_var_select_order(rng, with_exog):
+    endog = cointegrated_pair(rng, 150)
+    exog = (np.arange(150) >= 75).astype(float)[:, None] if with_exog else None
+    aic = var_aic_by_lag(endog, exog, 6)
+    expected = VAR(endog, exog=exog).select_order(6, trend='c').ics['aic']
+    np.testing.assert_allclose(aic, expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize('maxlags', [1, 3, 6])
+def test_select_ecm_order_matches_vecm_select_order(rng, maxlags):
+    endog = cointegrated_pair(rng, 150)
+    expected = select_order(endog, maxlags, deterministic='ci').aic
+    assert select_ecm_order(endog, maxlags=maxlags) == expected
+
+
+@pytest.mark.parametrize('k_ar_diff', [0, 1, 3])
+def test_johansen_trace_rank_matches_select_coint_rank(rng, k_ar_diff):
+    cointegrated = cointegrated_pair(rng, 200)
+    independent = np.cumsum(rng.normal(size=(200, 2)), axis=0)
+    for endog in (cointegrated, independent):
+        expected = select_coint_rank(endog, det_order=0, k_ar_diff=k_ar_diff).rank
+        assert johansen_trace_rank(endog, k_ar_diff) == expected
+
+
+@pytest.mark.parametrize('dense_max_nobs', [0, 500])
+def test_r_matrices_fast_matches_statsmodels(rng, dense_max_nobs):
+    # 0 forces the solve-based path, 500 keeps statsmodels' dense formulation
+    delta_y_1_T = rng.normal(size=(2, 300))
+    y_lag1 = rng.normal(size=(3, 300))
+    delta_x = np.vstack([np.ones(300), rng.normal(size=(4, 300))])
+    r0, r1 = r_matrices_fast(delta_y_1_T, y_lag1, delta_x, dense_max_nobs=dense_max_nobs)
+    expected_r0, expected_r1 = vecm_module._r_matrices(delta_y_1_T, y_lag1, delta_x)
+    np.testing.assert_allclose(r0, expected_r0, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(r1, expected_r1, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.filterwarnings('ignore:verbose is deprecated:FutureWarning')
+def test_granger_at_lags_matches_grangercausalitytests(rng):
+    x = rng.normal(size=100)
+    y = np.concatenate([[0.0], 0.5 * x[:-1]]) + rng.normal(size=100)
+    results = granger_at_lags(y, x, range(1, 5))
+    expected = grangercausalitytests(np.column_stack([y, x]), maxlag=4, verbose=False)
+    assert sorted(results) == sorted(expected)
+    for lag, tests in results.items():
+        for name, (stat, pvalue) in tests.items():
+            np.testing.assert_allclose(stat, expected[lag][0][name][0], rtol=1e-10)
+            np.testing.assert_allclose(pvalue, expected[lag][0][name][1], rtol=1e-8, atol=1e-14)
+
+
+def test_granger_at_lags_rejects_constant_series(rng):
+    with pytest.raises(ValueError):
+        granger_at_lags(np.ones(50), rng.normal(size=50), range(1, 3))
+
+
+def test_acf_fft_and_pacf_match_statsmodels(rng):
+    resid = rng.normal(size=(80, 2))
+    acf_cols = np.ascontiguousarray(acf_fft(resid, nlags=20).T)
+    pacf_cols = pacf_durbin_levinson(acf_cols)
+    for j in range(resid.shape[1]):
+        np.testing.assert_allclose(acf_cols[j], acf(resid[:, j], nlags=20, fft=True), rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose(pacf_cols[j], pacf(resid[:, j], nlags=20, method='ywm'), rtol=1e-10, atol=1e-14)
+
+
+def test_jarque_bera_durbin_watson_match_statsmodels(rng):
+    resid = rng.standard_t(5, size=(90, 3))
+    jb_stat, jb_pvalue, dw_stat = jarque_bera_durbin_watson(resid)
+    for j in range(resid.shape[1]):
+        expected = jarque_bera(resid[:, j])
+        np.testing.assert_allclose(jb_stat[j], expected[0], rtol=1e-10)
+        np.testing.assert_allclose(jb_pvalue[j], expected[1], rtol=1e-10)
+        np.testing.assert_allclose(dw_stat[j], durbin_watson(resid[:, j]), rtol=1e-12)
+
+
+def test_arch_lm_test_matches_het_arch(rng):
+    resid = rng.normal(size=(90, 2)) * np.linspace(0.5, 2.0, 90)[:, None]
+    lm_stat, lm_pvalue = arch_lm_test(resid)
+    for j in range(resid.shape[1]):
+        expected = het_arch(resid[:, j])
+        np.testing.assert_allclose(lm_stat[j], expected[0], rtol=1e-10)
+        np.testing.assert_allclose(lm_pvalue[j], expected[1], rtol=1e-10)
+
+
+@pytest.mark.parametrize('dummy', ['none', 'regime', 'constant'])
+def test_breusch_godfrey_test_matches_statsmodels(rng, dummy):
+    nobs = 90
+    columns = [np.ones(nobs), rng.normal(size=nobs)]
+    if dummy == 'regime':
+        columns.append((np.arange(nobs) >= 45).astype(float))
+    elif dummy == 'constant':
+        # A regime dummy that never switches duplicates the constant
+        columns.append(np.ones(nobs))
+    exog = np.column_stack(columns)
+    results = sm.OLS(exog @ np.arange(1.0, exog.shape[1] + 1) + rng.normal(size=nobs), exog).fit()
+    lm_stat, lm_pvalue = breusch_godfrey_test(results.resid[:, None], exog)
+    expected = acorr_breusch_godfrey(results, nlags=5)
+    np.testing.assert_allclose(lm_stat[0], expected[0], rtol=1e-9)
+    np.testing.assert_allclose(lm_pvalue[0], expected[1], rtol=1e-9)
+
+
+@pytest.mark.parametrize('nobs, dense_max_nobs', [(800, 500), (300, 0)])
+def test_fast_r_matrices_vecm_matches_upstream(rng, nobs, dense_max_nobs):
+    # Above the dense threshold, and a short sample forced onto the solve-based path
+    endog = cointegrated_pair(rng, nobs)
+    expected = vecm_module.VECM(endog, k_ar_diff=2, coint_rank=1, deterministic='ci').fit()
+    with fast_r_matrices(dense_max_nobs):
+        results = vecm_module.VECM(endog, k_ar_diff=2, coint_rank=1, deterministic='ci').fit()
+        for name in ('alpha', 'beta', 'gamma', 'llf', 'stderr_beta'):
+            np.testing.assert_allclose(getattr(results, name), getattr(expected, name), rtol=1e-12, atol=1e-12)
+
+
+def test_fast_r_matrices_restores_upstream():
+    original = vecm_module._r_matrices
+    with pytest.raises(RuntimeError):
+        with fast_r_matrices():
+            assert vecm_module._r_matrices is not original
+            raise RuntimeError
+    assert vecm_module._r_matrices is original
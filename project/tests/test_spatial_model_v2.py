@@ -0,0 +1,48 @@
+"""
+calculate_vif against the statsmodels per-column regressions it replaces.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.stats.outliers_influence import variance_inflation_factor
+
+from spatial_analysis.spatial_model_v2 import calculate_vif
+
+
+def design(kind, rng, nobs=200):
+    x = rng.normal(size=(nobs, 3))
+    if kind == 'random':
+        columns = [x[:, 0], x[:, 1], x[:, 2]]
+    elif kind == 'explicit_constant':
+        columns = [np.ones(nobs), x[:, 0], x[:, 1]]
+    elif kind == 'dummy_pair':
+        # Complementary regime dummies span the constant without a constant column
+        dummy = (rng.random(nobs) < 0.4).astype(float)
+        columns = [dummy, 1.0 - dummy, x[:, 0], x[:, 1]]
+    elif kind == 'near_collinear':
+        columns = [np.ones(nobs), x[:, 0], x[:, 0] + 1e-4 * x[:, 1], x[:, 2]]
+    return pd.DataFrame(np.column_stack(columns), columns=[f'x{i}' for i in range(len(columns))])
+
+
+@pytest.mark.parametrize('kind, rtol', [
+    ('random', 1e-12),
+    ('explicit_constant', 1e-12),
+    ('dummy_pair', 1e-12),
+    # VIFs near 1e8 lose about eight digits in either formulation
+    ('near_collinear', 1e-6),
+])
+def test_calculate_vif_matches_statsmodels(kind, rtol):
+    X = design(kind, np.random.default_rng(2024))
+    vif = calculate_vif(X, logging.getLogger(__name__))
+    expected = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
+    assert list(vif['Variable']) == list(X.columns)
+    np.testing.assert_allclose(vif['VIF'], expected, rtol=rtol)
+
+
+def test_calculate_vif_single_predictor():
+    X = pd.DataFrame({'x0': np.arange(10.0)})
+    vif = calculate_vif(X, logging.getLogger(__name__))
+    assert list(vif['VIF']) == [1.0]
@@ -0,0 +1,345 @@
+"""
+Econometric kernels shared by the ECM scripts.
+
+Each function reproduces the statsmodels routine named in its docstring on the arrays the scripts
+already hold, so the results match statsmodels while skipping its per-call overhead.
+"""
+
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from numba import njit
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.stats import chi2, f as f_dist, kurtosis, skew
+from statsmodels.tsa.coint_tables import c_sjt
+from statsmodels.tsa.vector_ar import vecm as vecm_module
+from statsmodels.tsa.vector_ar.vecm import select_coint_rank
+
+@njit(cache=True)
+def adf_autolag_kernel(x, maxlag):
+    """
+    ADF regression with a constant and AIC lag selection, as in adfuller(x, autolag='AIC').
+    Returns (adf_stat, usedlag, nobs, icbest).
+    """
+    xdiff = x[1:] - x[:-1]
+    ndiff = xdiff.shape[0]
+
+    # Lag search on the common sample; columns are constant, lagged level, lagged differences,
+    # so every candidate model is a column prefix of one QR
+    nobs = ndiff - maxlag
+    full = np.empty((nobs, maxlag + 2))
+    full[:, 0] = 1.0
+    full[:, 1] = x[maxlag:maxlag + nobs]
+    for j in range(1, maxlag + 1):
+        full[:, j + 1] = xdiff[maxlag - j:ndiff - j]
+    target = np.ascontiguousarray(xdiff[maxlag:])
+    q, _ = np.linalg.qr(full)
+    proj = q.T @ target
+
+    fitted = np.zeros(nobs)
+    icbest = np.inf
+    bestlag = 0
+    for k in range(1, maxlag + 3):
+        fitted += q[:, k - 1] * proj[k - 1]
+        if k < 2:
+            continue
+        ssr = 0.0
+        for t in range(nobs):
+            ssr += (target[t] - fitted[t]) ** 2
+        llf = -nobs / 2.0 * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1)
+        aic = -2.0 * llf + 2.0 * k
+        if aic < icbest:
+            icbest = aic
+            bestlag = k - 2
+
+    # Rerun on the longest sample for the selected lag; the lagged level goes last,
+    # so its t-statistic comes straight from the last projection
+    nobs = ndiff - bestlag
+    design = np.empty((nobs, bestlag + 2))
+    design[:, 0] = 1.0
+    for j in range(1, bestlag + 1):
+        design[:, j] = xdiff[bestlag - j:ndiff - j]
+    design[:, bestlag + 1] = x[bestlag:bestlag + nobs]
+    target = np.ascontiguousarray(xdiff[bestlag:])
+    q, r = np.linalg.qr(design)
+    proj = q.T @ target
+    resid = target - q @ proj
+    sigma2 = (resid @ resid) / (nobs - (bestlag + 2))
+    last = bestlag + 1
+    adf_stat = proj[last] * np.sign(r[last, last]) / np.sqrt(sigma2)
+    return adf_stat, bestlag, nobs, icbest
+
+def var_aic_by_lag(endog, exog, maxlags):
+    """
+    AIC of the VAR(p) with a constant (and exog) for p = 0..maxlags on the common sample after maxlags,
+    as in VAR.select_order. Every candidate is a column prefix of one lagged design, so a single QR yields all residuals.
+    """
+    T, neqs = endog.shape
+    nobs = T - maxlags
+    target = endog[maxlags:]
+
+    # Deterministic terms first, then the lag blocks in increasing order
+    deterministic = [np.ones((nobs, 1))]
+    if exog is not None:
+        deterministic.append(exog[maxlags:])
+    lags = [endog[maxlags - k:T - k] for k in range(1, maxlags + 1)]
+    design = np.hstack(deterministic + lags)
+    k_exog = design.shape[1] - neqs * maxlags
+
+    q, r = np.linalg.qr(design)
+    # Drop columns in the span of earlier ones (lstsq ignores them too); every prefix keeps its span
+    diag = np.abs(np.diag(r))
+    keep = diag > diag.max() * max(design.shape) * np.finfo(np.float64).eps
+    if not keep.all():
+        q, _ = np.linalg.qr(design[:, keep])
+    proj = q.T @ target
+
+    aic = []
+    for p in range(maxlags + 1):
+        k = k_exog + p * neqs
+        if nobs - k > 0:
+            k_fit = int(keep[:k].sum())
+            resid = target - q[:, :k_fit] @ proj[:k_fit]
+            ld = np.linalg.slogdet(resid.T @ resid / nobs)[1]
+        else:
+            ld = -np.inf
+        free_params = p * neqs ** 2 + neqs * k_exog
+        aic.append(ld + 2.0 / nobs * free_params)
+    return np.array(aic)
+
+def select_ecm_order(endog, exog=None, *, maxlags):
+    """
+    AIC-selected VECM lag order, matching select_order(..., deterministic='ci').
+    """
+    # VAR orders 1..maxlags + 1 correspond to VECM orders 0..maxlags
+    return int(np.argmin(var_aic_by_lag(endog, exog, maxlags + 1)[1:]))
+
+def johansen_trace_rank(endog, k_ar_diff, signif_index=1):
+    """
+    Cointegration rank from the Johansen trace test, as select_coint_rank(endog, det_order=0, k_ar_diff)
+    returns it. Only the eigenvalues are needed, so the eigenvector normalization is skipped and the
+    lagged differences are partialled out with one QR.
+    """
+    neqs = endog.shape[1]
+    levels = endog - endog.mean(axis=0)
+    dx = np.diff(levels, axis=0)
+    nobs = len(dx) - k_ar_diff
+    # Differences and lagged levels, each demeaned and then purged of lags 1..k_ar_diff of the differences
+    delta = dx[k_ar_diff:] - dx[k_ar_diff:].mean(axis=0)
+    lagged = levels[1:1 + nobs] - levels[1:1 + nobs].mean(axis=0)
+    if k_ar_diff > 0:
+        z = np.hstack([dx[k_ar_diff - i:k_ar_diff - i + nobs] for i in range(1, k_ar_diff + 1)])
+        q, _ = np.linalg.qr(z - z.mean(axis=0))
+        delta = delta - q @ (q.T @ delta)
+        lagged = lagged - q @ (q.T @ lagged)
+
+    s00 = delta.T @ delta / nobs
+    sk0 = lagged.T @ delta / nobs
+    skk = lagged.T @ lagged / nobs
+    eigvals = np.linalg.eigvals(np.linalg.inv(skk) @ sk0 @ np.linalg.inv(s00) @ sk0.T)
+    trace_stats = None
+    if not np.iscomplexobj(eigvals):
+        log_terms = np.log(1.0 - np.sort(eigvals)[::-1])
+        trace_stats = -nobs * np.cumsum(log_terms[::-1])[::-1]
+    if trace_stats is None or not np.isfinite(trace_stats).all():
+        # Degenerate eigenvalues: leave the decision to statsmodels
+        return select_coint_rank(endog, det_order=0, k_ar_diff=k_ar_diff).rank
+
+    rank = 0
+    while rank < neqs and trace_stats[rank] >= c_sjt(neqs - rank, 0)[signif_index]:
+        rank += 1
+    return rank
+
+def r_matrices_fast(delta_y_1_T, y_lag1, delta_x, dense_max_nobs=500):
+    """
+    Drop-in for statsmodels' vecm._r_matrices: partials delta_x out of delta_y_1_T and y_lag1 as
+    Y - (Y X')(X X')^-1 X, which never forms the T x T annihilator matrix. Samples of up to
+    dense_max_nobs observations keep statsmodels' dense formulation.
+    """
+    nobs = delta_x.shape[1]
+    if nobs <= dense_max_nobs:
+        # statsmodels' formulation: cheap at this size, and it keeps results on near-collinear
+        # designs (a constant regime dummy next to the 'ci' constant) identical to statsmodels
+        m = np.identity(nobs) - delta_x.T.dot(np.linalg.inv(delta_x.dot(delta_x.T))).dot(delta_x)
+        return delta_y_1_T.dot(m), y_lag1.dot(m)
+
+    gram = delta_x.dot(delta_x.T)
+    stacked = np.vstack([delta_y_1_T, y_lag1])
+    # solve() factorizes like inv(), so singular designs still raise LinAlgError
+    resid = stacked - np.linalg.solve(gram, delta_x.dot(stacked.T)).T.dot(delta_x)
+    neqs = delta_y_1_T.shape[0]
+    return resid[:neqs], resid[neqs:]
+
+@contextmanager
+def fast_r_matrices(dense_max_nobs=500):
+    """
+    Route statsmodels' VECM partialling through r_matrices_fast inside the block, or the decorated
+    function, and restore the original vecm._r_matrices on exit. VECMResults partials again lazily
+    (llf, the beta standard errors), so the scope should cover reading the results as well as fit().
+    """
+    original = vecm_module._r_matrices
+    vecm_module._r_matrices = partial(r_matrices_fast, dense_max_nobs=dense_max_nobs)
+    try:
+        yield
+    finally:
+        vecm_module._r_matrices = original
+
+def granger_at_lags(y, x, lags):
+    """
+    Granger causality tests of x -> y at the given lags from one lagged design, one QR per lag.
+    Matches grangercausalitytests(maxlag=list(lags)): each lag uses its own trimmed sample and a constant.
+    """
+    lags = np.asarray(lags)
+    maxlag = int(lags.max())
+    n = len(y)
+    if n <= 3 * maxlag + 1:
+        raise ValueError("Insufficient observations. Maximum allowable lag is {0}".format(int((n - 1) / 3) - 1))
+    if np.ptp(y) == 0 or np.ptp(x) == 0:
+        raise ValueError("The series include constant values and so the test statistic cannot be computed.")
+
+    # Lagged copies of both series, built once: column k - 1 holds lag k, zero-padded at the start
+    y_lags = sliding_window_view(np.concatenate([np.zeros(maxlag), y]), maxlag + 1)[:, ::-1][:, 1:]
+    x_lags = sliding_window_view(np.concatenate([np.zeros(maxlag), x]), maxlag + 1)[:, ::-1][:, 1:]
+
+    ssr_u = np.empty(len(lags))
+    ssr_r = np.empty(len(lags))
+    df_resid = np.empty(len(lags))
+    for i, p in enumerate(lags):
+        nobs = n - p
+        target = y[p:]
+        # Constant and own lags first, so the restricted model is a leading block of the QR
+        design = np.column_stack([np.ones(nobs), y_lags[p:, :p], x_lags[p:, :p]])
+        q, r = np.linalg.qr(design)
+        # Drop columns in the span of earlier ones; the restricted prefix keeps its span
+        diag = np.abs(np.diag(r))
+        keep = diag > diag.max() * max(design.shape) * np.finfo(np.float64).eps
+        if not keep.all():
+            q, _ = np.linalg.qr(design[:, keep])
+        coef = q.T @ target
+
+        resid = target - q @ coef
+        ssr_u[i] = resid @ resid
+        n_restricted = int(keep[:p + 1].sum())
+        ssr_r[i] = ssr_u[i] + coef[n_restricted:] @ coef[n_restricted:]
+        df_resid[i] = nobs - int(keep.sum())
+
+    # Statistics and p-values for all lags at once
+    nobs = n - lags
+    f_stat = (ssr_r - ssr_u) / ssr_u / lags * df_resid
+    chi2_stat = nobs * (ssr_r - ssr_u) / ssr_u
+    lr_stat = nobs * np.log(ssr_r / ssr_u)
+    f_pvalue = f_dist.sf(f_stat, lags, df_resid)
+    chi2_pvalue = chi2.sf(chi2_stat, lags)
+    lr_pvalue = chi2.sf(lr_stat, lags)
+
+    results = {}
+    for i, p in enumerate(lags.tolist()):
+        results[p] = {
+            'ssr_ftest': (f_stat[i], f_pvalue[i]),
+            'ssr_chi2test': (chi2_stat[i], chi2_pvalue[i]),
+            'lrtest': (lr_stat[i], lr_pvalue[i]),
+            # The OLS Wald F on the x lags equals the SSR-based F
+            'params_ftest': (f_stat[i], f_pvalue[i]),
+        }
+    return results
+
+def acf_fft(resid, nlags):
+    """
+    Autocorrelations up to nlags from one zero-padded FFT, as in acf(resid, nlags=nlags, fft=True).
+    A 2-D input is treated column by column, with lags along the rows.
+    """
+    x = np.asarray(resid, dtype=np.float64)
+    x = x - x.mean(axis=0)
+    nobs = len(x)
+    nfft = next_fast_len(2 * nobs + 1)
+    spectrum = rfft(x, n=nfft, axis=0)
+    acov = irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=nfft, axis=0)[:min(nlags, nobs - 1) + 1]
+    return acov / acov[0]
+
+@njit(cache=True)
+def pacf_durbin_levinson(acf_cols):
+    """
+    Partial autocorrelations from the (biased) autocorrelations by the Durbin-Levinson recursion,
+    which matches pacf(method='ywm'). Takes one row of autocorrelations per residual column.
+    """
+    ncols, width = acf_cols.shape
+    nlags = width - 1
+    pacf_cols = np.empty((ncols, width))
+    phi = np.zeros(width)
+    prev = np.zeros(width)
+    for c in range(ncols):
+        acf_vals = acf_cols[c]
+        pacf_cols[c, 0] = 1.0
+        prev[:] = 0.0
+        for k in range(1, nlags + 1):
+            num = acf_vals[k]
+            den = 1.0
+            for j in range(1, k):
+                num -= prev[j] * acf_vals[k - j]
+                den -= prev[j] * acf_vals[j]
+            phi[k] = num / den
+            for j in range(1, k):
+                phi[j] = prev[j] - phi[k] * prev[k - j]
+            for j in range(1, k + 1):
+                prev[j] = phi[j]
+            pacf_cols[c, k] = phi[k]
+    return pacf_cols
+
+def jarque_bera_durbin_watson(resid):
+    """
+    Jarque-Bera and Durbin-Watson statistics for every column of resid (n x k) at once,
+    as in jarque_bera and durbin_watson applied column by column. Returns (jb_stat, jb_pvalue, dw_stat).
+    """
+    resid = np.asarray(resid, dtype=np.float64)
+    n = resid.shape[0]
+    skewness = skew(resid, axis=0)
+    kurt = 3 + kurtosis(resid, axis=0)
+    jb_stat = (n / 6.0) * (skewness ** 2 + (1 / 4.0) * (kurt - 3) ** 2)
+    # einsum reduces each column's sum of squares in one pass, without the squared temporaries
+    step = np.diff(resid, axis=0)
+    dw_stat = np.einsum('ij,ij->j', step, step) / np.einsum('ij,ij->j', resid, resid)
+    return jb_stat, chi2.sf(jb_stat, 2), dw_stat
+
+def arch_lm_test(resid):
+    """
+    Engle's ARCH LM test for each column of resid (n x k), as het_arch with its default
+    min(10, nobs // 5) lags. Each column has its own lag design, so the auxiliary regressions run
+    column by column, without building statsmodels OLS results. Returns (lm_stat, lm_pvalue).
+    """
+    squared = np.asarray(resid, dtype=np.float64) ** 2
+    maxlag = min(10, squared.shape[0] // 5)
+    nobs = squared.shape[0] - maxlag
+    lm_stat = np.empty(squared.shape[1])
+    for j in range(squared.shape[1]):
+        # Row t holds squared[t..t + maxlag]: the target is the last entry and its lags precede it
+        windows = sliding_window_view(squared[:, j], maxlag + 1)
+        target = windows[:, -1]
+        design = np.column_stack([np.ones(nobs), windows[:, :-1]])
+        ols_resid = target - design @ np.linalg.lstsq(design, target, rcond=None)[0]
+        centered = target - target.mean()
+        lm_stat[j] = nobs * (1.0 - (ols_resid @ ols_resid) / (centered @ centered))
+    return lm_stat, chi2.sf(lm_stat, maxlag)
+
+def breusch_godfrey_test(resid, exog, nlags=5):
+    """
+    Breusch-Godfrey LM test for each column of resid (n x k), as acorr_breusch_godfrey with exog as
+    the model regressors. The auxiliary regressions run column by column, without building statsmodels
+    OLS results; each pinv covers the whole design, so rank-deficient exog resolves as in OLS.
+    Returns (lm_stat, lm_pvalue).
+    """
+    resid = np.asarray(resid, dtype=np.float64)
+    nobs = resid.shape[0]
+    lm_stat = np.empty(resid.shape[1])
+    for j in range(resid.shape[1]):
+        # Row t holds resid[t - nlags..t], with zeros before the sample starts; the lags go in
+        # lagmat's order (lag 1 first), which matters when a constant dummy duplicates the constant
+        windows = sliding_window_view(np.concatenate([np.zeros(nlags), resid[:, j]]), nlags + 1)
+        target = windows[:, -1]
+        design = np.column_stack([exog, np.ones(nobs), windows[:, -2::-1]])
+        # Same pseudo-inverse cutoff as OLS, so rank-deficient designs resolve the same way
+        ols_resid = target - design @ (np.linalg.pinv(design, rcond=1e-15) @ target)
+        centered = target - target.mean()
+        lm_stat[j] = nobs * (1.0 - (ols_resid @ ols_resid) / (centered @ centered))
+    return lm_stat, chi2.sf(lm_stat, nlags)